@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Compare the serial and concurrent scans with artificial per-listing latency
+# Last changed: 2026-10-17, injected os.scandir latency for both parsers' scans
+#
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import tast_parser
+import crossmark_parser
+from synth import make_crossbench_tree, make_tast_tree
+
+LATENCY = 0.005  # Seconds added to every os.scandir call, like a round trip to an NFS server
+CONCURRENCY = 32
+
+# Wrap os.scandir (which os.walk also uses) so every directory listing waits first
+class ScandirLatency:
+    def __init__(self, latency):
+        self.latency = latency
+        self.original = os.scandir
+
+    def __enter__(self):
+        original = self.original
+        latency = self.latency
+
+        def slow_scandir(path="."):
+            time.sleep(latency)  # Sleeping releases the GIL, as a blocked syscall does
+            return original(path)
+
+        os.scandir = slow_scandir
+        return self
+
+    def __exit__(self, *exc):
+        os.scandir = self.original
+
+# Run one scan under the injected latency and report its wall time
+def measure(name, scan):
+    with ScandirLatency(LATENCY):
+        start = time.perf_counter()
+        results = scan()
+        elapsed = time.perf_counter() - start
+    print(f"{name},{len(results)},{elapsed * 1000:.0f}")
+    return sorted(results), elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tast_base = make_tast_tree(tmp, configs=8, runs=20)
+        crossbench_base = make_crossbench_tree(tmp, configs=4, runs=10, depth=2, fanout=3)
+        json_file = "speedometer_3.0.json"
+
+        print(f"# {LATENCY * 1000:.0f} ms per directory listing, concurrency {CONCURRENCY}")
+        print("scan,files,ms")
+        for label, serial, concurrent in (
+                ("tast os.walk",
+                 lambda: tast_parser.find_results_json(tast_base),
+                 lambda: tast_parser.find_results_json(tast_base, concurrency=CONCURRENCY)),
+                ("crossmark bfs",
+                 lambda: crossmark_parser.find_shallowest_results_json(crossbench_base, json_file),
+                 lambda: crossmark_parser.find_shallowest_results_json(crossbench_base, json_file, concurrency=CONCURRENCY))):
+            serial_results, serial_time = measure(f"{label} serial", serial)
+            concurrent_results, concurrent_time = measure(f"{label} concurrent", concurrent)
+
+            if serial_results != concurrent_results:
+                print(f"Error: {label} scans returned different result sets.")
+                sys.exit(1)
+            print(f"{label}: same {len(serial_results)} files, {serial_time / concurrent_time:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
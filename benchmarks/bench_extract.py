@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Compare json.load with extract_json_path on each JSON backend
+# Last changed: 2026-10-17, label rows with the JSON backend in use
+#
+
+import os
+import sys
+import json
+import time
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from results_loader import JSON_BACKEND, extract_json_path
+from synth import write_results_chart
+
+JSON_KEY = "Benchmark.Speedometer3.Score"
+KEYS = (JSON_KEY, "summary", "value")
+
+# The extraction tast_parser used before: decode the whole document
+def full_load(json_file_path, keys):
+    with open(json_file_path, 'r') as f:
+        data = json.load(f)
+    for key in keys:
+        data = data[key]
+    return data
+
+# Time one extractor and measure its peak Python memory
+def measure(extract, path, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        value = extract(path, KEYS)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    extract(path, KEYS)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, elapsed, peak
+
+
+def main():
+    cases = [
+        ("small", 3, 10, True, 2000),
+        ("4MB key first", 40, 5000, True, 5),
+        ("4MB key last", 40, 5000, False, 5),
+    ]
+
+    # Rows labelled "json" use the streaming extractor; set
+    # DATA_PARSERS_JSON_BACKEND to compare the other backends
+    print("chart,size KB,extractor,ms,peak KB")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, metrics, values, key_first, repeat in cases:
+            path = os.path.join(tmp, name.replace(" ", "_"), "results-chart.json")
+            write_results_chart(path, JSON_KEY, 321.5, metrics, values, key_first)
+            size = os.path.getsize(path) // 1024
+
+            results = []
+            for label, extract in (("json.load", full_load), (JSON_BACKEND, extract_json_path)):
+                value, elapsed, peak = measure(extract, path, repeat)
+                results.append(value)
+                print(f"{name},{size},{label},{elapsed * 1000:.3f},{peak // 1024}")
+
+            if results[0] != results[1]:
+                print(f"Error: extractors disagree on {name}: {results}")
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Compare memory of nested string lists with the shared run records
+# Last changed: 2026-10-17, write the records row by row
+#
+
+import os
+import sys
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from results_table import RunRecords, TableWriter
+
+CONFIGS = 200
+RUNS = 500
+
+# The parse output the parsers used before: one list of formatted strings per config
+def build_string_lists(runs):
+    main_list = []
+    for config, values in runs:
+        main_list.append([config] + [f"{value:.2f}" for value in values])
+    return main_list
+
+# The padding and averaging the parsers used before, re-parsing every string
+def pad_and_average(main_list):
+    max_length = max(len(sublist) for sublist in main_list)
+    for sublist in main_list:
+        values_to_average = [float(value) for value in sublist[1:]]
+        avg_value = sum(values_to_average) / len(values_to_average) if values_to_average else 0
+        sublist.extend([''] * (max_length - len(sublist)))
+        sublist.append(f"{avg_value:.2f}")
+    return main_list
+
+# Function to build the shared run records for the same runs
+def build_records(runs, paths):
+    records = RunRecords()
+    for (config, values), config_paths in zip(runs, paths):
+        for i, (value, path) in enumerate(zip(values, config_paths), 1):
+            records.append("Speedometer3", config, f"run{i}", "Benchmark.Speedometer3.Score", value, path)
+    return records
+
+# Function to write the records row by row, as the parsers now do, to a sink that keeps nothing
+def write_records(records):
+    groups = records.grouped(("config",))
+    width = max(len(values) for values in groups.values())
+    with open(os.devnull, "w") as sink:
+        writer = TableWriter(["Speedometer3"], width, out=sink)
+        for labels, values in groups.items():
+            writer.write_row(labels, values)
+
+# Measure the memory held by the parse output and the peak through the written table
+def measure(name, build, finish):
+    tracemalloc.start()
+    parsed = build()
+    held, _ = tracemalloc.get_traced_memory()
+    finish(parsed)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name},{held // 1024},{peak // 1024}")
+    return held
+
+
+def main():
+    rng = random.Random(0)
+    runs = [(f"config{c}", [rng.uniform(100, 400) for _ in range(RUNS)]) for c in range(CONFIGS)]
+    # The scanned paths exist in both pipelines, so they are built outside the measurement
+    paths = [[f"/results/config{c}/run{i}/results-chart.json" for i in range(1, RUNS + 1)] for c in range(CONFIGS)]
+
+    print(f"# {CONFIGS} configs x {RUNS} runs")
+    # The old pipeline holds the whole formatted table; the writer formats one row at a time
+    print("representation,parse output KB,peak KB")
+    old = measure("nested string lists", lambda: build_string_lists(runs), pad_and_average)
+    new = measure("run records", lambda: build_records(runs, paths), write_records)
+    print(f"parse output {old / new:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Compare the two-pass os.walk scan with the single-pass crossmark scanner
+# Last changed: 2026-10-17, directory entry counts and wall time
+#
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import crossmark_parser
+from synth import make_crossbench_tree
+
+# Wrap os.scandir (which os.walk also uses) so every listed entry is counted
+class ScandirCounter:
+    def __init__(self):
+        self.entries = 0
+        self.original = os.scandir
+
+    def __enter__(self):
+        counter = self
+
+        class CountingIterator:
+            def __init__(self, it):
+                self.it = it
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.it.close()
+
+            def __iter__(self):
+                return self
+
+            def __next__(self):
+                entry = next(self.it)
+                counter.entries += 1
+                return entry
+
+            def close(self):
+                self.it.close()
+
+        os.scandir = lambda path=".": CountingIterator(counter.original(path))
+        return self
+
+    def __exit__(self, *exc):
+        os.scandir = self.original
+
+# The scan crossmark_parser used before: a full walk for the depth, then a second walk
+def two_pass_scan(path_arg, json_file):
+    shallowest_depth = float('inf')
+    for root, _, files in os.walk(path_arg):
+        if json_file in files:
+            shallowest_depth = min(shallowest_depth, root.count(os.sep))
+
+    results = []
+    for root, dirs, files in os.walk(path_arg):
+        if root.count(os.sep) > shallowest_depth:
+            del dirs[:]
+            continue
+        if json_file in files:
+            results.append(os.path.join(root, json_file))
+    return results
+
+# Run one scanner and report visited entries and wall time
+def measure(name, scan, path_arg, json_file):
+    with ScandirCounter() as counter:
+        start = time.perf_counter()
+        results = scan(path_arg, json_file)
+        elapsed = time.perf_counter() - start
+    print(f"{name},{len(results)},{counter.entries},{elapsed * 1000:.1f}")
+    return results, counter.entries
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        base = make_crossbench_tree(tmp, configs=4, runs=10, depth=4, fanout=3)
+        json_file = "speedometer_3.0.json"
+
+        print("scanner,files,entries visited,ms")
+        old_results, old_entries = measure("two-pass os.walk", two_pass_scan, base, json_file)
+        new_results, new_entries = measure("single-pass bfs", crossmark_parser.find_shallowest_results_json, base, json_file)
+
+        if sorted(old_results) != sorted(new_results):
+            print("Error: scanners returned different result sets.")
+            sys.exit(1)
+        print(f"entries visited reduced {old_entries / new_entries:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Time every parser end to end and per stage on synthetic data, against stored baselines
+# Last changed: 2026-10-17, baseline recorded on this machine on the first run instead of committed
+#
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from synth import make_crossbench_tree, make_irun_html, make_tast_tree
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+# Timings only hold on the machine that took them, so the baseline lives in the user's cache, not the repo
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "data-parsers")
+BASELINE_FILE = os.path.join(CACHE_DIR, "bench_baseline.json")
+
+# Function to read the workload and harness options
+def check_argument():
+    parser = argparse.ArgumentParser(prog="bench_suite.py")
+    parser.add_argument("--configs", type=int, default=8, help="configs per tast/crossbench tree (default: 8)")
+    parser.add_argument("--runs", type=int, default=25, help="runs per config (default: 25)")
+    parser.add_argument("--depth", type=int, default=2,
+                        help="extra nesting levels in the tast tree, and probe levels in the crossbench tree (default: 2)")
+    parser.add_argument("--size-kb", type=int, default=16, help="approximate size of each result file in KB (default: 16)")
+    parser.add_argument("--malformed", type=float, default=0.05,
+                        help="share of truncated result files, and of unparsable irun values (default: 0.05)")
+    parser.add_argument("--irun-tests", type=int, default=20, help="tests per InteractiveRunner page (default: 20)")
+    parser.add_argument("--irun-iterations", type=int, default=50, help="iterations per InteractiveRunner page (default: 50)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case; the median is reported (default: 5)")
+    parser.add_argument("--case", action="append", default=[], metavar="NAME",
+                        help="only run this case (repeatable): " + ", ".join(CASES))
+    parser.add_argument("--baseline", default=BASELINE_FILE, metavar="FILE",
+                        help="baseline numbers to compare against; recorded by the first run (default: "
+                             "~/.cache/data-parsers/bench_baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run's numbers as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="flag a stage as a regression when it is this much slower than the baseline (default: 0.25)")
+    parser.add_argument("--min-ms", type=float, default=5.0,
+                        help="ignore slowdowns smaller than this many milliseconds, which are mostly noise (default: 5)")
+    return parser.parse_args()
+
+# Each case runs one parser script on one generated input: (script, input name, extra arguments)
+CASES = {
+    "tast": ("tast_parser.py", "tast", ["--no-cache"]),
+    "tast-all-metrics": ("tast_parser.py", "tast", ["--no-cache", "--all-metrics"]),
+    "crossmark": ("crossmark_parser.py", "crossbench", ["--no-cache"]),
+    "irun": ("irun_parser.py", "irun", []),
+}
+
+# Function to generate every input of the workload under root
+def make_inputs(root, args):
+    return {
+        "tast": make_tast_tree(root, args.configs, args.runs, depth=args.depth, size_kb=args.size_kb,
+                               malformed=args.malformed),
+        "crossbench": make_crossbench_tree(root, args.configs, args.runs, depth=args.depth, fanout=2,
+                                           size_kb=args.size_kb, malformed=args.malformed),
+        "irun": make_irun_html(os.path.join(root, "irun", "speedometer2.1.html"), args.irun_tests, 8,
+                               args.irun_iterations, args.malformed),
+    }
+
+# Function to run one parser as a separate process, the way it is used, and return its wall time
+def run_parser(script, path, extra, profile_file=None):
+    command = [sys.executable, os.path.join(REPO_DIR, script), path] + extra
+    if profile_file:
+        command += ["--profile", profile_file]
+
+    start = time.perf_counter()
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        print(f"Error: {' '.join(command)} exited with status {result.returncode}.")
+        sys.exit(1)
+    return elapsed
+
+# Function to measure one case: median end-to-end and per-stage times in milliseconds
+def measure(script, path, extra, repeat, tmp):
+    times = [run_parser(script, path, extra) for _ in range(repeat)]
+    numbers = {"total": statistics.median(times) * 1000}
+
+    # Stage times come from as many --profile runs, whose tracemalloc tracing
+    # slows the run down, so they are only comparable with other stage times
+    profile_file = os.path.join(tmp, "profile.json")
+    stages = {}
+    for _ in range(repeat):
+        run_parser(script, path, extra, profile_file)
+        with open(profile_file) as f:
+            for stage in json.load(f)["stages"]:
+                stages.setdefault(stage["name"], []).append(stage["seconds"] * 1000)
+    for name, stage_times in stages.items():
+        numbers[name] = statistics.median(stage_times)
+    return numbers
+
+# Function to read the stored baseline, or None if there is none yet
+def read_baseline(baseline_file):
+    try:
+        with open(baseline_file) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Error reading baseline {baseline_file}: {e}")
+        sys.exit(1)
+
+
+def main():
+    args = check_argument()
+    cases = args.case or list(CASES)
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        print(f"Unknown case: {', '.join(unknown)}. Choose from {', '.join(CASES)}.")
+        sys.exit(1)
+
+    workload = {"configs": args.configs, "runs": args.runs, "depth": args.depth, "size_kb": args.size_kb,
+                "malformed": args.malformed, "irun_tests": args.irun_tests, "irun_iterations": args.irun_iterations}
+    baseline = read_baseline(args.baseline)
+    save_baseline = args.save_baseline
+    if baseline is None:
+        # The first run on a machine becomes its baseline
+        print(f"# No baseline yet, this run is saved to {args.baseline}", file=sys.stderr)
+        save_baseline = True
+    elif baseline["workload"] != workload:
+        print(f"# Baseline {args.baseline} was taken with another workload, not comparing", file=sys.stderr)
+        baseline = None
+    elif (baseline.get("python"), baseline.get("machine")) != (platform.python_version(), platform.machine()):
+        print(f"# Baseline {args.baseline} was taken with another Python or machine, not comparing "
+              "(--save-baseline replaces it)", file=sys.stderr)
+        baseline = None
+
+    results = {}
+    regressions = []
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = make_inputs(tmp, args)
+
+        print(f"# {json.dumps(workload)}, median of {args.repeat} runs")
+        print("case,stage,ms,baseline_ms,change")
+        for case in cases:
+            script, input_name, extra = CASES[case]
+            numbers = measure(script, inputs[input_name], extra, args.repeat, tmp)
+            results[case] = {stage: round(ms, 3) for stage, ms in numbers.items()}
+
+            for stage, ms in numbers.items():
+                base_ms = baseline["results"].get(case, {}).get(stage) if baseline else None
+                if base_ms is None:
+                    print(f"{case},{stage},{ms:.1f},,")
+                    continue
+                change = ms / base_ms - 1 if base_ms else 0.0
+                flag = ""
+                if change > args.threshold and ms - base_ms > args.min_ms:
+                    flag = " REGRESSION"
+                    regressions.append(f"{case} {stage}")
+                print(f"{case},{stage},{ms:.1f},{base_ms:.1f},{change * 100:+.0f}%{flag}")
+
+    if save_baseline:
+        # Baselines are only meaningful on the machine that took them
+        baseline = {"workload": workload, "python": platform.python_version(), "machine": platform.machine(),
+                    "results": results}
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"# Baseline saved to {args.baseline}", file=sys.stderr)
+    elif regressions:
+        print(f"Regressions over {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
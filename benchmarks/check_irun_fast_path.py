@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Check that the irun <pre> fast path and the HTMLParser path extract the same text
+# Last changed: 2026-10-17, synthetic and irregular pages, plus any real pages given
+#
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import irun_parser
+from synth import make_irun_html
+
+# Edits applied to a generated page, each a markup case the fast path must
+# either get exactly right or hand to HTMLParser: (name, function of the text)
+VARIANTS = (
+    ("plain", lambda text: text),
+    ("entities", lambda text: text.replace(" : Step1 : ", " : Step&#49; &amp; &lt;1&gt; : ")),
+    ("crlf", lambda text: text.replace("\n", "\r\n")),
+    ("uppercase tags", lambda text: text.replace("<pre>", "<PRE>").replace("</pre>", "</PRE >")),
+    ("pre attributes", lambda text: text.replace("<pre>", "<pre class=results>")),
+    ("quoted attributes", lambda text: text.replace("<pre>", "<pre title=\"a>b\">")),
+    ("comment before", lambda text: text.replace("<body>", "<body><!-- <pre>not this</pre> -->")),
+    ("script before", lambda text: text.replace("<body>", "<body><script>var s = '<pre>x</pre>';</script>")),
+    ("attribute before", lambda text: text.replace("<body>", "<body><a title=\"<pre>no</pre>\">link</a>")),
+    ("nested tag", lambda text: text.replace(" : Step0 : ", " : <b>Step0</b> : ", 1)),
+    ("self-closing pre", lambda text: text.replace("<body>", "<body><pre/>")),
+    ("two pre blocks", lambda text: text.replace("</body>", "<pre>second block</pre></body>")),
+    ("unclosed pre", lambda text: text.replace("</pre>", "")),
+    ("no pre", lambda text: text.replace("<pre>", "<div>").replace("</pre>", "</div>")),
+    ("empty file", lambda text: ""),
+)
+
+# Function to compare both paths on one page; returns (path taken, fast seconds, HTMLParser seconds)
+def compare(path):
+    start = time.perf_counter()
+    fast = irun_parser.find_pre_content(path)
+    fast_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    slow = irun_parser.parse_pre_content_html(path)
+    slow_time = time.perf_counter() - start
+
+    if fast is None:
+        return "htmlparser", fast_time, slow_time
+    if fast != slow:
+        print(f"Error: the fast path and HTMLParser disagree on {path}.")
+        sys.exit(1)
+    return "fast", fast_time, slow_time
+
+# Function to list the HTML pages given on the command line (files or directories)
+def real_pages(args):
+    pages = []
+    for arg in args:
+        if os.path.isdir(arg):
+            pages.extend(irun_parser.find_html_files(arg))
+        else:
+            pages.append(arg)
+    return pages
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        pages = []
+        for size_name, tests, iterations in (("small", 5, 1), ("large", 40, 300)):
+            base = make_irun_html(os.path.join(tmp, f"{size_name}.html"), tests, 8, iterations, malformed=0.01)
+            with open(base, newline='') as f:
+                text = f.read()
+            for name, variant in VARIANTS:
+                path = os.path.join(tmp, f"{size_name} {name}.html")
+                with open(path, 'w', newline='') as f:
+                    f.write(variant(text))
+                pages.append((f"{size_name} {name}", path))
+        pages.extend((path, path) for path in real_pages(sys.argv[1:]))
+
+        print("page,path,fast_ms,htmlparser_ms")
+        for name, path in pages:
+            taken, fast_time, slow_time = compare(path)
+            print(f"{name},{taken},{fast_time * 1000:.2f},{slow_time * 1000:.2f}")
+        print(f"# {len(pages)} pages, identical output wherever the fast path answered")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Generate synthetic results trees for the parser benchmarks
+# Last changed: 2026-10-17, nesting depth, file size and malformed files; InteractiveRunner HTML
+#
+
+import os
+import json
+import random
+
+VALUE_BYTES = 20  # Roughly what one random float takes in a JSON list
+
+# Function to write a JSON document, creating parent directories as needed
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+# Function to write a JSON document cut off halfway, as left behind by a crashed run
+def write_truncated_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    text = json.dumps(data)
+    with open(path, 'w') as f:
+        f.write(text[:len(text) // 2])
+
+# Function to make a list of random floats taking about size_kb kilobytes as JSON
+def bulk_values(rng, size_kb):
+    return [rng.uniform(0, 1000) for _ in range(size_kb * 1024 // VALUE_BYTES)]
+
+# Function to build a crossbench-style tree under root
+def make_crossbench_tree(root, configs=4, runs=10, depth=4, fanout=3, size_kb=0, malformed=0.0, seed=0):
+    # Each run directory holds a speedometer_3.0.json plus a nested tree of
+    # per-iteration/probe directories (depth levels with fanout children each),
+    # which also contain speedometer_3.0.json copies like real crossbench output.
+    # size_kb pads every file with per-iteration values before the score, and
+    # about a malformed share of the run-level files are truncated.
+    rng = random.Random(seed)
+    base = os.path.join(root, "speedometer3.0")
+
+    for c in range(configs):
+        for r in range(1, runs + 1):
+            run_dir = os.path.join(base, f"config{c}", f"run{r}")
+            score = {"Score": {"average": rng.uniform(10, 30)}}
+            if size_kb:
+                score = {"Iterations": {"values": bulk_values(rng, size_kb)}, **score}
+            data = {"chrome": {"data": score}}
+            if malformed and rng.random() < malformed:
+                write_truncated_json(os.path.join(run_dir, "speedometer_3.0.json"), data)
+            else:
+                write_json(os.path.join(run_dir, "speedometer_3.0.json"), data)
+
+            level = [run_dir]
+            for _ in range(depth):
+                next_level = []
+                for parent in level:
+                    for i in range(fanout):
+                        child = os.path.join(parent, f"iteration_{i}")
+                        write_json(os.path.join(child, "speedometer_3.0.json"), data)
+                        next_level.append(child)
+                level = next_level
+
+    return base
+
+# Function to write a tast results-chart.json with extra per-iteration metrics
+def write_results_chart(path, json_key, value, metrics=0, values_per_metric=0, key_first=True, seed=0):
+    # key_first chooses whether the requested key comes before or after the
+    # bulky per-iteration metrics, the best and worst case for a streaming reader
+    rng = random.Random(seed)
+    score = {json_key: {"summary": {"units": "score", "improvement_direction": "up",
+                                    "type": "scalar", "value": value}}}
+    bulk = {}
+    for m in range(metrics):
+        bulk[f"Iteration{m}.Time"] = {
+            "summary": {"units": "ms", "improvement_direction": "down", "type": "list_of_scalar_values",
+                        "values": [rng.uniform(0, 1000) for _ in range(values_per_metric)]},
+        }
+
+    write_json(path, {**score, **bulk} if key_first else {**bulk, **score})
+
+# Function to build a tast-style tree under root: <benchmark>/<config>/run<N>/tast/results/results-chart.json
+def make_tast_tree(root, configs=4, runs=10, json_key="Benchmark.Speedometer3.Score", seed=0,
+                   depth=0, size_kb=0, malformed=0.0):
+    # depth adds that many nested directories between the run and tast/
+    # directories, size_kb pads every file with ten per-iteration metrics
+    # before the score (the worst case for the streaming reader), and about a
+    # malformed share of the files are truncated
+    rng = random.Random(seed)
+    base = os.path.join(root, "speedometer3_sweep")
+    nesting = [f"level{d}" for d in range(depth)]
+    values_per_metric = size_kb * 1024 // (10 * VALUE_BYTES)
+
+    for c in range(configs):
+        for r in range(1, runs + 1):
+            path = os.path.join(base, f"config{c}", f"run{r}", *nesting, "tast", "results", "results-chart.json")
+            value = rng.uniform(100, 400)
+            if malformed and rng.random() < malformed:
+                write_truncated_json(path, {json_key: {"summary": {"value": value}}, "Iteration0.Time": {}})
+            else:
+                write_results_chart(path, json_key, value, 10 if size_kb else 0, values_per_metric,
+                                    key_first=False, seed=seed + c * runs + r)
+
+    return base
+
+# Function to write a Speedometer 2.1 InteractiveRunner page with one block of lines per iteration
+def make_irun_html(path, tests=10, steps=8, iterations=1, malformed=0.0, seed=0):
+    # Every block lists 'test : step : Sync/Async : value ms' lines and each
+    # test's total, then the four summary lines the parser filters out; about
+    # a malformed share of the step values are replaced by text
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(iterations):
+        for t in range(tests):
+            test = f"Framework{t}-TodoMVC"
+            total = 0.0
+            for s in range(steps):
+                for mode in ("Sync", "Async"):
+                    value = rng.uniform(0.5, 80)
+                    total += value
+                    if malformed and rng.random() < malformed:
+                        lines.append(f"{test} : Step{s} : {mode} : timeout")
+                    else:
+                        lines.append(f"{test} : Step{s} : {mode} : {value:.4f} ms")
+            lines.append(f"{test} : {total:.4f} ms")
+        lines.append(f"Total : {rng.uniform(1000, 2000):.4f} ms")
+        lines.append(f"Arithmetic Mean : {rng.uniform(50, 100):.4f} ms")
+        lines.append(f"Geometric Mean : {rng.uniform(50, 100):.4f} ms")
+        lines.append(f"Score : {rng.uniform(50, 200):.3f} rpm")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write("<!DOCTYPE html>\n<html><head><title>Speedometer 2.1 Interactive Runner</title></head>\n")
+        f.write("<body><div id=\"steps\"><a href=\"#\">Framework0-TodoMVC</a></div>\n<pre>\n")
+        f.write("\n".join(lines))
+        f.write("\n</pre>\n</body></html>\n")
+    return path
@@ -3,21 +3,62 @@
 # Author:       Rix Woodling
 # Created:      2024-10-14
 # Description:  Parse Speedometer 3.0 ( soon to be more ) crossbench data into a table
-# Last changed: 2024-10-14, Speedometer 3.0 and Score only output
+# Last changed: 2026-10-17, CSV rows are buffered so the table keeps the width of the parsed runs
 #
 
 import os
 import sys
-import json
-
-# Function to check if the argument is provided
+import argparse
+
+from results_index import PathIndex
+from results_cache import open_cache
+from results_archive import ArchiveReader, is_archive
+from results_shard import parse_shard, shard_filter, write_partial
+from results_scan import AsyncScanner
+from results_profile import add_profile_arguments, open_profiler
+from results_watch import watch_results
+from results_table import STATS, RunRecords, TableWriter
+from results_loader import extract_json_path, iter_values, load_values, print_errors, print_json_backend
+
+# Function to check if the argument is provided and read the options
 def check_argument():
     if len(sys.argv) < 2:
         print("# how to use")
         print("python3 crossbench_parser.py path/to/speedometer3.0/")
         print("python3 crossbench_parser.py path/to/speedometer3.0/ | tee mytest.csv")
+        print("python3 crossbench_parser.py path/to/speedometer3.0/ --jobs 8")
+        print("python3 crossbench_parser.py path/to/speedometer3.0/ --format jsonl | jq .")
+        print("python3 crossbench_parser.py path/to/speedometer3.0/ --watch")
+        print("python3 crossbench_parser.py path/to/speedometer3.0.zip")
+        print("python3 crossbench_parser.py path/to/speedometer3.0/ --shard 1/4 > part1.json")
         sys.exit(1)  # Exit if no argument is provided
-    return sys.argv[1]
+
+    parser = argparse.ArgumentParser(prog="crossbench_parser.py")
+    parser.add_argument("path", help="directory holding the crossbench results, or a .tar(.gz) or .zip of it")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="load speedometer_3.0.json files in N worker processes")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="read every file instead of reusing the parse cache in ~/.cache")
+    parser.add_argument("--show-json-backend", action="store_true",
+                        help="print the JSON backend in use (simdjson, orjson or json) to stderr")
+    parser.add_argument("--stats", action="store_true",
+                        help="add Median, Stdev, CV%%, Min, Max and P95 columns after Avg")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv",
+                        help="print CSV rows, or one JSON object per row (JSON Lines)")
+    parser.add_argument("--scan-concurrency", type=int, default=1, metavar="N",
+                        help="list up to N directories at once while scanning (for NFS or sshfs mounts; default: 1, a serial walk)")
+    parser.add_argument("--scan-timeout", type=float, metavar="SECONDS",
+                        help="with --scan-concurrency, skip (with a warning) directories that take longer to list")
+    add_profile_arguments(parser)
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N",
+                        help="parse only shard I of N (split by top-level directory) and print a partial result file for results_merge.py")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and update the table as new result files land (Ctrl-C stops)")
+    parser.add_argument("--watch-interval", type=float, default=2.0, metavar="SECONDS",
+                        help="how often --watch checks for new files (default: 2)")
+    parser.add_argument("--poll", action="store_true",
+                        help="with --watch, rescan the tree instead of using inotify")
+    return parser.parse_args()
 
 # Function to check if the path exists
 def check_path_exists(path_arg):
@@ -33,7 +74,9 @@ def check_directory(path_arg):
 #        print("Path exists and is a directory.")
         return path_arg  # Return the directory path
     elif os.path.isfile(path_arg):
-        print("Please select a directory as the argument, not a file.")
+        if is_archive(path_arg):
+            return path_arg  # A .tar(.gz) or .zip of a results tree is read in place
+        print("Please select a directory or a .tar/.zip archive as the argument, not a file.")
         sys.exit(1)
 
 # Get the target JSON filename based on keywords in the path
@@ -51,228 +94,108 @@ def get_target_filename(path_arg):
         print("No recognized keyword found (speedometer3.0, speedometer, webxprt4, motionmark1_3).")
         sys.exit(1)
 
-# Find the shallowest occurrence of the target JSON file and return its depth
-def find_shallowest_depth(path_arg, json_file):
-    # Find the shallowest occurrence of the target JSON file and return its depth.
-    shallowest_depth = float('inf')
-
-    # Walk the directory tree starting from the given path
-    for root, _, files in os.walk(path_arg):
-        if json_file in files:
-            current_depth = root.count(os.sep)
-            if current_depth < shallowest_depth:
-                shallowest_depth = current_depth
-
-    if shallowest_depth == float('inf'):
-        print(f"No '{json_file}' file found in {path_arg}.")
-        sys.exit(1)  # Exit if no valid JSON is found
-
-    return shallowest_depth
-
-# Find all occurrences of the target JSON file up to the specified depth
-def find_results_json(path_arg, json_file, max_depth):
-    # Find all occurrences of the target JSON file up to the specified depth.
-    results = []
-
-    # Walk the directory tree starting from the given path
-    for root, dirs, files in os.walk(path_arg):
-        current_depth = root.count(os.sep)
-
-        # Stop traversal if the depth exceeds the max depth
-        if current_depth > max_depth:
-            del dirs[:]  # Prevent deeper traversal
-            continue
-
-        if json_file in files:
-            results.append(os.path.join(root, json_file))
-
-    return results
-
-# Function to identify the first non-unique column (separated by '/')
-def find_non_unique_column(results):
-    if not results:
-        print("No results to process.")
-        return None  # Handle the case where the input is empty
-
-    # Split each result path into components
-    split_results = [result.split('/') for result in results]
-
-    # Iterate through the columns of the paths
-    for i in range(len(split_results[0])):
-        # Extract the i-th element from each split path
-        column_elements = [path[i] for path in split_results]
-
-        # Check if all elements in this column are the same
-        if len(set(column_elements)) > 1:
-            # Adding 1 to make it 1-based index
-            return i + 1
-
-    print("All columns are unique across the paths.")
-    return None  # If no non-unique column is found
-
-def collect_unique_column(results, non_unique_column):
-    # Collect unique values from the specified non-unique column.
-    if non_unique_column is None:
-        print("No non-unique column found.")
-        return []  # Return an empty list if no non-unique column is found
-
-    # Split each path into components
-    split_results = [result.split('/') for result in results]
-
-    # Extract the elements from the specified column (1-based index)
-    column_values = [path[non_unique_column - 1] for path in split_results]
-
-    # Get unique values and sort them (by length and then lexicographically)
-    unique_values = sorted(set(column_values), key=lambda x: (len(x), x))
-
-    return unique_values  # Always return a list of unique values
-
-# Function to sort the results based on unique values
-def sort_results_by_unique_values(results, unique_values):
-    # Sort results within each group of unique values.
-    sorted_results = []
-
-    # Loop through each unique value
-    for value in unique_values:
-        # Filter results that contain the current unique value as a component
-        value_results = [result for result in results if f"/{value}/" in result]
-
-        if value_results:
-            # Split each path into components
-            split_results = [result.split('/') for result in value_results]
-
-            # Determine the length of the shortest path
-            max_depth = min(len(path) for path in split_results)
-
-            # If only one result exists for this unique value, add it directly
-            if len(value_results) == 1:
-                sorted_results.extend(value_results)
-                continue
-
-            # Compare components starting from the end, moving backwards
-            for i in range(1, max_depth + 1):
-                # Get the i-th component from the end for all paths
-                components = [path[-i] for path in split_results]
-
-                # Check if the components differ
-                if len(set(components)) > 1:
-                    # Sort by this non-unique component and add to the sorted list
-                    sorted_value_results = sorted(value_results, key=lambda x: x.split('/')[-i])
-                    sorted_results.extend(sorted_value_results)
-                    break
-            else:
-                # If all components are identical, just add the unsorted results
-                sorted_results.extend(value_results)
-
-    return sorted_results
+# Find every occurrence of the target JSON file at the shallowest depth in one pass
+def find_shallowest_results_json(path_arg, json_file, required=True, include=None, concurrency=1, timeout=None):
+    # With required=False an empty list is returned instead of exiting.
+    # include picks the top-level entries of one shard (see --shard).
+    if concurrency > 1:
+        # On slow network mounts, list all directories of a level at once instead
+        results = AsyncScanner(concurrency, timeout).find_shallowest(path_arg, json_file, include)
+    else:
+        results = scan_levels(path_arg, json_file, include)
 
-def parse_data_from_json_files(unique_values, sorted_results, json_key="Score"):
-    # Parse JSON files and return a nested list of headers with extracted average values.
-    main_list = []
+    if results or not required:
+        return results
+    print(f"No '{json_file}' file found in {path_arg}.")
+    sys.exit(1)  # Exit if no valid JSON is found
 
-    # Loop through each unique value (e.g., 'BLUE', 'RED')
-    for value in unique_values:
-        value_list = [value]  # Start the sublist with the unique value as the header
+# Function to scan the tree breadth-first for the shallowest occurrences of the target JSON file
+def scan_levels(path_arg, json_file, include=None):
+    # Scan the tree breadth-first, one depth level at a time, and stop as soon as
+    # a level contains the target JSON file so nothing deeper is ever listed.
+    level = [path_arg]
+    top = True  # Only the entries of path_arg itself are filtered by include
 
-        # Filter results that match the current unique value
-        value_results = [result for result in sorted_results if f"/{value}/" in result]
+    while level:
+        results = []
+        next_level = []
 
-        # Process each matching JSON file and extract the 'average' value
-        for result in value_results:
+        for directory in level:
             try:
-                with open(result, 'r') as f:
-                    data = json.load(f)
-
-                    # Dynamically get the first key at the top level (e.g., "chrome", "firefox", etc.)
-                    top_level_key = next(iter(data))
-
-                    # Navigate to the 'average' value
-                    score = data[top_level_key]["data"][json_key]["average"]
-
-                    value_list.append(f"{score:.2f}")  # Add the formatted score to the list
-            except (KeyError, FileNotFoundError, json.JSONDecodeError) as e:
-                print(f"Error processing file {result}: {e}")
-                continue  # Skip to the next result if there's an error
-
-        # Append the completed sublist to the main list
-        main_list.append(value_list)
-
-    return main_list
-
-# Function to find the largest sublist in main_list and return its size
-def find_largest_sublist(main_list):
-    # Find the largest sublist in main_list and return its size.
-    max_length = 0  # Initialize the max length variable
-
-    # Loop through each sublist in the main_list
-    for sublist in main_list:
-        # Compare the current sublist length with the max length
-        if len(sublist) > max_length:
-            max_length = len(sublist)  # Update max length if this sublist is larger
-
-    return max_length  # Return the size of the largest sublist
-
-# Function to calculate the average for sublist values and pad sublists
-def pad_and_average_sublists(main_list):
-    # Pad sublists to the same length and append the average of their values.
-    max_length = find_largest_sublist(main_list)  # Find the largest sublist size
-
-    for sublist in main_list:
-        # Convert values (from the second item onward) to floats for averaging
-        values_to_average = [float(value) for value in sublist[1:]]
-
-        # Calculate the average if there are values, otherwise set to 0
-        avg_value = sum(values_to_average) / len(values_to_average) if values_to_average else 0
-
-        # Pad the sublist with empty strings until it matches the largest sublist size
-        sublist.extend([''] * (max_length - len(sublist)))
-
-        # Append the average (formatted to 2 decimal places) at the end of the sublist
-        sublist.append(f"{avg_value:.2f}")
-
-    return main_list
-
-# Function to create the header and insert it into the main list
-def insert_header(main_list, json_file, largest_sublist_size):
-    # Create the header and insert it into the main list.
-
-    # Use the target filename as the base for the header key
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if top and include is not None and not include(entry.name):
+                            continue  # Belongs to another shard
+                        if entry.is_dir(follow_symlinks=False):
+                            next_level.append(entry.path)  # Queue for the next level
+                        elif entry.name == json_file:
+                            results.append(entry.path)
+            except OSError:
+                continue  # Skip unreadable directories, as os.walk does
+
+        # Every match at this depth has been found, no need to go deeper
+        if results:
+            return results
+
+        level = next_level
+        top = False
+
+    return []
+
+# Function to keep only the paths at the shallowest depth, as the scan does
+def keep_shallowest(paths):
+    if not paths:
+        return paths
+    depth = min(path.count('/') for path in paths)
+    return [path for path in paths if path.count('/') == depth]
+
+# Function to load a JSON file and extract its 'average' score
+def extract_score_from_json(json_file_path, json_key):
+    # The first top-level key (None) is the browser, e.g. "chrome" or "firefox";
+    # errors are raised to load_values, which collects them per file
+    return extract_json_path(json_file_path, (None, "data", json_key, "average"))
+
+# Function to turn the target filename into the table label, e.g. "Speedometer 3.0"
+def benchmark_label(json_file):
     # Remove underscores, capitalize the first word, and strip ".json"
-    header_key = json_file.replace("_", " ").replace(".json", "").capitalize()
-
-    # Create a list for the header, starting with the formatted key
-    header = [header_key]
-
-    # Add "R1", "R2", ..., up to "R{largest_sublist_size - 1}"
-    for i in range(1, largest_sublist_size):
-        header.append(f"R{i}")
-
-    # Append 'Avg' as the last column
-    header.append("Avg")
-
-    # Insert the header at the start of the main list
-    main_list.insert(0, header)
-
-    return main_list
-
-# Function to print each sublist in CSV format
-def print_as_csv(main_list):
-    for sublist in main_list:
-        # Join the sublist elements into a single CSV-formatted string
-        csv_line = ','.join(sublist)
-        print(csv_line)
+    return json_file.replace("_", " ").replace(".json", "").capitalize()
+
+# Function to parse the JSON files of each group into run records, yielding each group as soon as it is loaded
+def parse_data_from_json_files(index, json_file, errors, json_key="Score", jobs=1, cache=None, read=None):
+    # Parse JSON files and yield one run record per extracted average value.
+    benchmark = benchmark_label(json_file)
+
+    # Load every JSON file in sorted order, in parallel when jobs > 1
+    # and only for new or changed files when a cache is given; failures
+    # are appended to errors in the same order. read yields archive members.
+    outcomes = iter_values(index.sorted_paths, extract_score_from_json, (json_key,), jobs, cache, read)
+
+    # Loop through each unique value (e.g., 'BLUE', 'RED') and its sorted results
+    for value, value_results in index.groups.items():
+        records = RunRecords()
+        for result, (score, error) in zip(value_results, outcomes):
+            # Skip files that failed to load; scores are rounded only at output time
+            if error is not None:
+                errors.append((result, error))
+            else:
+                records.append(benchmark, value, index.run_ids.get(result), json_key, score, result)
+        yield value, records
 
 
 def main():
     # Get the argument and check if it's valid
-    path_arg = check_argument()
+    args = check_argument()
+    path_arg = args.path
 #    print(path_arg)
 
+    # With --profile, time each stage below and report it on exit (stdout is untouched)
+    profiler = open_profiler(args)
+
     # Check if the path exists
     check_path_exists(path_arg)
 #    print(check_path_exists(path_arg))
 
-    # Check if the path is a directory
+    # Check if the path is a directory (or an archive of one)
     directory = check_directory(path_arg)
 #    print(directory)
 
@@ -280,44 +203,109 @@ def main():
     json_file = get_target_filename(path_arg)
 #    print(json_file)
 
-    # Find the shallowest depth of the target JSON file
-    shallowest_depth = find_shallowest_depth(directory, json_file)
-#    print(shallowest_depth)
-
-    # Find all occurrences of the target JSON file up to the shallowest depth
-    results = find_results_json(path_arg, json_file, shallowest_depth)
+    # Find all occurrences of the target JSON file at the shallowest depth, on disk
+    # or among the archive members (the tree may still be empty when watching a
+    # sweep that has just started)
+    reader = None
+    read = None
+    with profiler.stage("scan") as stage:
+        if os.path.isfile(directory):
+            if args.watch:
+                print("--watch needs a directory; an archive does not change.")
+                sys.exit(1)
+            reader = ArchiveReader(directory, json_file)
+            results = keep_shallowest(reader.paths)
+            read = reader.read
+            if not results:
+                print(f"No '{json_file}' file found in {path_arg}.")
+                sys.exit(1)
+        elif args.shard:
+            if args.watch:
+                print("--shard cannot be combined with --watch.")
+                sys.exit(1)
+            # Only the top-level directories of this shard; a shard may find nothing,
+            # and its shallowest files may still be deeper than another shard's
+            results = find_shallowest_results_json(directory, json_file, required=False, include=shard_filter(args.shard),
+                                                   concurrency=args.scan_concurrency, timeout=args.scan_timeout)
+        else:
+            results = find_shallowest_results_json(directory, json_file, required=not args.watch,
+                                                   concurrency=args.scan_concurrency, timeout=args.scan_timeout)
+        stage.files = len(results)
 #    print(results)
 
-    # Identify the first non-unique column in the results
-    non_unique_column = find_non_unique_column(results)
-#    print(non_unique_column)
-
-    # Collect and print unique values from the non-unique column
-    unique_values = collect_unique_column(results, non_unique_column)
-#    print(unique_values)
-
-    # Sort the results by unique values
-    sorted_results = sort_results_by_unique_values(results, unique_values)
-#    print(sorted_results)
-
-    # Parse the JSON files and extract average values
-    main_list = parse_data_from_json_files(unique_values, sorted_results)
-#    print(main_list)
-
-    # Find the largest sublist in the parsed data
-    largest_sublist_size = find_largest_sublist(main_list)
-#    print(largest_sublist_size)
-
-    # Pad and average the sublists
-    padded_main_list = pad_and_average_sublists(main_list)
-#    print(padded_main_list)
-
-    # Insert the header into the main list
-    final_list = insert_header(padded_main_list, json_file, largest_sublist_size)
-#    print(final_list)
-
-    # Print each sublist in CSV format
-    print_as_csv(main_list)
+    if args.shard:
+        # Write this shard's raw scores as a partial result file instead of the
+        # table; results_merge.py keeps the shallowest files across all shards
+        if reader is not None:
+            print("--shard needs a directory; read an archive in one run instead.")
+            sys.exit(1)
+        meta = {"parser": "crossmark", "path": path_arg, "mode": "score", "json_file": json_file}
+        with profiler.stage("parse") as stage:
+            cache = open_cache("crossmark:Score", not args.no_cache)
+            values, errors = load_values(results, extract_score_from_json, ("Score",), args.jobs, cache)
+            if cache is not None:
+                cache.close()
+            stage.files = len(results)
+        with profiler.stage("emit"):
+            write_partial(sys.stdout, meta, args.shard, results, values, errors)
+        return
+
+    if args.watch:
+        # Keep the table up to date while the runs are in flight, parsing only
+        # new files; deeper copies of the target file are ignored as in a scan
+        cache = open_cache("crossmark:Score", not args.no_cache)
+        stat_names = STATS if args.stats else ("Avg",)
+        watch_results(directory, json_file, results, extract_score_from_json, ("Score",),
+                      benchmark_label(json_file), stat_names, args.format, args.jobs, cache,
+                      select_paths=keep_shallowest, prune=True, interval=args.watch_interval, polling=args.poll)
+        if cache is not None:
+            cache.close()
+        return
+
+    # Index the paths once to find the non-unique column, its unique values
+    # and the sorted results under each value
+    with profiler.stage("index") as stage:
+        index = PathIndex(results, os.path.basename(os.path.normpath(path_arg)))
+        stage.files = len(index.sorted_paths)
+    if index.varying_column is None and len(index.paths) > 1:
+        print("All columns are unique across the paths.")
+#    print(index.headers)
+#    print(index.sorted_paths)
+
+    # Reuse scores from the parse cache for files that have not changed;
+    # archive members have no inode or mtime to check, so they skip it
+    cache = open_cache("crossmark:Score", not args.no_cache and reader is None)
+
+    stat_names = STATS if args.stats else ("Avg",)
+    writer = TableWriter([benchmark_label(json_file)], stat_names=stat_names, output_format=args.format)
+
+    # Parse the JSON files; every unique value gets a row, even if none of its
+    # files could be parsed. JSON Lines rows are written as soon as their files
+    # are loaded; CSV rows are kept until the end, so the header is as wide as
+    # the largest group of parsed scores and the statistics take one
+    # vectorized pass
+    errors = []
+    table = []
+    rows = parse_data_from_json_files(index, json_file, errors, jobs=args.jobs, cache=cache, read=read)
+    for value, records in profiler.iterate("parse", rows, len(index.sorted_paths)):
+        if args.format == "jsonl":
+            with profiler.stage("emit"):
+                writer.write_row((value,), records.values)
+        else:
+            table.append(((value,), records.values))
+#        print(len(records))
+    if cache is not None:
+        cache.close()
+    if args.format == "csv":
+        with profiler.stage("emit"):
+            writer.write_rows(table)
+    if reader is not None:
+        reader.close()
+
+    # Report the files that could not be parsed, after the table
+    print_errors(errors)
+    if args.show_json_backend:
+        print_json_backend()
 
 
 if __name__ == "__main__":
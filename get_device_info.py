@@ -0,0 +1,600 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Get system device information from procfs and sysfs, with the same CSV as get_device_info.sh
+# Last changed: 2026-10-17, cache entries are kept apart by the privilege they were collected with
+#
+
+import os
+import re
+import csv
+import sys
+import glob
+import json
+import shlex
+import signal
+import struct
+import sqlite3
+import asyncio
+import argparse
+import itertools
+import subprocess
+
+CPU_DIR = "/sys/devices/system/cpu"
+CORE_GROUPS = ("P-cores (Logical)", "E-cores", "LP-cores")
+HYBRID_PMUS = (("cpu_core", "core"), ("cpu_atom", "atom"))  # Intel hybrid core types, by perf PMU
+TOOL_TIMEOUT = 60  # Seconds before a hung tool counts as having printed nothing
+SSH_COMMAND = "ssh -T -o BatchMode=yes -o ConnectTimeout=10"
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "data-parsers")
+CACHE_FILE = "device_info.sqlite"
+
+# Leading number of a field, as awk converts it ("1100 MHz" -> 1100, "" -> 0)
+_AWK_NUMBER = re.compile(r'\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?')
+
+# Function to check the options
+def check_argument():
+    parser = argparse.ArgumentParser(prog="get_device_info.py")
+    parser.add_argument("hosts", nargs="*", metavar="HOST",
+                        help="collect from these hosts (e.g. root@10.23.15.123) over ssh instead of this machine")
+    parser.add_argument("--hosts-file", metavar="FILE",
+                        help="read more hosts from FILE, one per line ('#' starts a comment)")
+    parser.add_argument("--concurrency", type=int, default=32, metavar="N",
+                        help="with hosts, collect from up to N hosts at once (default: 32)")
+    parser.add_argument("--timeout", type=float, default=120, metavar="SECONDS",
+                        help="with hosts, give up on a host after SECONDS (default: 120)")
+    parser.add_argument("--ssh-command", default=SSH_COMMAND, metavar="CMD",
+                        help=f"command run as CMD HOST REMOTE-COMMAND for each host (default: {SSH_COMMAND})")
+    parser.add_argument("--root", default="/", metavar="DIR",
+                        help="read /proc, /sys and /etc below DIR instead of /, e.g. a copied or fake sysfs tree; "
+                             "with hosts, {host} is replaced by each host name")
+    parser.add_argument("--no-tools", action="store_true",
+                        help="don't run lscpu, dmidecode, crossystem, inteltool or ectool; their fields are left empty")
+    parser.add_argument("--topology", action="store_true",
+                        help="add a row per CPU group (same max frequency, core type, last-level cache and NUMA node)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="collect everything again instead of reusing the fields cached for an unchanged boot and build")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv",
+                        help="print Label,value lines, or the cache key and [label, value] pairs as JSON (used by the fleet mode)")
+    parser.add_argument("--cached-key", metavar="KEY", help=argparse.SUPPRESS)  # Set by the fleet mode, see remote_command
+    return parser.parse_args()
+
+# Function to turn text into a number the way awk does
+def awk_number(text):
+    match = _AWK_NUMBER.match(text)
+    return float(match.group()) if match else 0.0
+
+# Function to join output lines like $(...) does: newline separated, without trailing newlines
+def shell_output(lines):
+    return '\n'.join(lines).rstrip('\n')
+
+# Function to keep the lines containing a string, like grep
+def grep(text, needle):
+    return [line for line in text.splitlines() if needle in line]
+
+# Function to return fields N and up of a line, like cut -d" " -fN-
+def cut_fields(line, first):
+    if ' ' not in line:
+        return line  # cut prints lines without the delimiter unchanged
+    return ' '.join(line.split(' ')[first - 1:])
+
+# Function to expand a sysfs CPU list ("0-3,8" -> [0, 1, 2, 3, 8]); [] for an empty or unreadable list
+def parse_cpu_list(text):
+    cpus = []
+    for part in text.strip().split(','):
+        first, _, last = part.partition('-')
+        try:
+            cpus.extend(range(int(first), int(last or first) + 1))
+        except ValueError:
+            pass
+    return cpus
+
+# Function to print CPU numbers as ranges without commas, so the CSV field stays one field ("0-3 8")
+def format_cpu_list(cpus):
+    ranges = []
+    for _, run in itertools.groupby(enumerate(cpus), lambda item: item[1] - item[0]):
+        run = [cpu for _, cpu in run]
+        ranges.append(f"{run[0]}-{run[-1]}" if len(run) > 1 else f"{run[0]}")
+    return ' '.join(ranges)
+
+# Function to format a size in KiB the way free -h does (e.g. 5.9Gi, 503Mi)
+def free_human(kib):
+    size = kib * 1024
+    if len(f"{size}B") <= 4:
+        return f"{size}B"
+    for power, unit in enumerate("KMGTP", 1):
+        # free rounds through a C float before printing
+        scaled = struct.unpack('f', struct.pack('f', size / 1024 ** power))[0]
+        if len(f"{scaled:.1f}{unit}") <= 4:
+            return f"{scaled:.1f}{unit}i"
+        if len(f"{int(scaled)}{unit}") <= 4:
+            return f"{int(scaled)}{unit}i"
+    return f"{size}B"
+
+# Device information read from procfs/sysfs; each external tool runs at most once
+class DeviceInfo:
+    # root is where /proc, /sys and /etc are read from; with tools=False no
+    # external command runs, e.g. when root is a fake tree
+    def __init__(self, root="/", tools=True):
+        self.root = root
+        self.tools = tools
+        self.tool_output = {}
+        self.file_text = {}
+
+    # Return the text of a file below root, or "" if it cannot be read (like cat 2>/dev/null)
+    def read(self, path):
+        text = self.file_text.get(path)
+        if text is None:
+            try:
+                with open(os.path.join(self.root, path.lstrip('/')), errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                text = ""
+            self.file_text[path] = text
+        return text
+
+    # Return the output of a command, running it only the first time; "" if it is missing or fails to start
+    def tool(self, *command):
+        output = self.tool_output.get(command)
+        if output is None:
+            output = ""
+            if self.tools:
+                try:
+                    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                            timeout=TOOL_TIMEOUT, errors="replace").stdout
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self.tool_output[command] = output
+        return output
+
+    # Return the value of the first "key : value" line of /proc/cpuinfo
+    def cpuinfo(self, key):
+        for line in self.read("/proc/cpuinfo").splitlines():
+            name, _, value = line.partition(':')
+            if name.strip() == key:
+                return value.strip()
+        return None
+
+    # Model name: /proc/cpuinfo on x86; lscpu works it out from the CPU part on ARM
+    def model_name(self):
+        model = self.cpuinfo("model name")
+        if model is not None:
+            return model
+        lines = [line.split(':')[1].lstrip(" \t") if ':' in line else ""
+                 for line in self.tool("lscpu").splitlines() if line.startswith("Model name")]
+        return shell_output(lines)
+
+    # Mem Total as free -mh prints it, from MemTotal in /proc/meminfo
+    def mem_total(self):
+        for line in self.read("/proc/meminfo").splitlines():
+            if line.startswith("MemTotal:"):
+                return free_human(int(line.split()[1]))
+        return ""
+
+    # Last dmidecode -t memory line containing e.g. "Type: ", with everything up to the last ": " removed
+    def memory_field(self, label):
+        lines = grep(self.tool("dmidecode", "-t", "memory"), f"{label}: ")
+        return re.sub(r'.*: ', '', lines[-1], count=1) if lines else ""
+
+    # Field 2 (split at '=') of the /etc/os-release lines containing key
+    def os_release(self, key):
+        return [(line.split('=') + [""])[1] for line in grep(self.read("/etc/os-release"), key)]
+
+    # Field 3 of the crossystem fwid lines containing label
+    def firmware_id(self, label):
+        lines = grep(self.tool("crossystem"), "fwid")
+        return shell_output([(line.split() + ["", "", ""])[2] for line in lines if label in line])
+
+    # Number of CPUs, from the present mask (lscpu's CPU(s))
+    def cpu_total(self):
+        present = self.read("/sys/devices/system/cpu/present").strip()
+        if not present:
+            return ""
+        total = 0
+        for part in present.split(','):
+            first, _, last = part.partition('-')
+            total += int(last or first) - int(first) + 1
+        return str(total)
+
+    # Names of the entries of a directory below root matching prefix + number, in numeric order
+    def numbered_entries(self, path, prefix):
+        try:
+            names = os.listdir(os.path.join(self.root, path.lstrip('/')))
+        except OSError:
+            return []
+        numbers = [name[len(prefix):] for name in names if name.startswith(prefix)]
+        return [f"{prefix}{number}" for number in sorted(int(number) for number in numbers if number.isdigit())]
+
+    # Boot and build of the device, "<boot_id> <build ID>"; None without a boot_id (e.g. a fake tree)
+    def cache_key(self):
+        # A new build needs a reboot, which changes boot_id, so the same key
+        # means the same spec; reading it costs two small files and no tools
+        boot_id = self.read("/proc/sys/kernel/random/boot_id").strip()
+        if not boot_id:
+            return None
+        return f"{boot_id} {shell_output(self.os_release('BUILD_ID'))}"
+
+    # CPU topology, read on first use
+    def topology(self):
+        if not hasattr(self, "cpu_topology"):
+            self.cpu_topology = CpuTopology(self)
+        return self.cpu_topology
+
+    # Runs of equal cpuinfo_max_freq values over every policy in order: [(value, number of policies)]
+    def policy_groups(self):
+        # get_device_info.sh stops at policy13; this walks all of them
+        values = [value for _, value, _ in self.topology().policies]
+        return [(value, len(list(run))) for value, run in itertools.groupby(values)]
+
+    # GFX max frequency of every card, one line each
+    def gfx_max_freq(self):
+        lines = []
+        for path in sorted(glob.glob(os.path.join(self.root, "sys/class/drm/card?/gt_max_freq_mhz"))):
+            for line in self.read(os.path.relpath(path, self.root)).splitlines():
+                lines.append(f"{awk_number(line) / 1000:.2f} GHz")
+        return shell_output(lines)
+
+    # Field 4 of the inteltool -t lines containing "enabled"
+    def tme_enabled(self):
+        return shell_output([(line.split() + [""] * 4)[3] for line in grep(self.tool("inteltool", "-t"), "enabled")])
+
+    # Value of a CBI tag, as ectool cbi get prints it after "As uint:"
+    def cbi(self, tag):
+        return shell_output([cut_fields(line, 3) for line in grep(self.tool("ectool", "cbi", "get", str(tag)), "uint")])
+
+    # One row per CPU group, after the number of groups: [(label, value)]
+    def topology_fields(self):
+        groups = self.topology().groups()
+        fields = [("CPU groups", str(len(groups)))]
+        for i, (key, cpus) in enumerate(groups, 1):
+            max_freq, core_type, cache, package, node = key
+            parts = [f"{len(cpus)} x {awk_number(max_freq) / 1000000:.2f} GHz" if max_freq else f"{len(cpus)} x"]
+            parts.extend(part for part in (core_type, cache, package and f"package{package}", node and f"node{node}") if part)
+            cores = self.topology().core_count(cpus)
+            cores = f"{cores} core{'s' if cores > 1 else ''}: " if cores else ""
+            fields.append((f"CPU group {i}", f"{' '.join(parts)} ({cores}CPUs {format_cpu_list(cpus)})"))
+        return fields
+
+    # Every field in the order of get_device_info.sh: [(label, value)]
+    def fields(self):
+        fields = [
+            ("Model name", self.model_name()),
+            ("Mem Total", self.mem_total()),
+            ("Mem Type", self.memory_field("Type")),
+            ("Mem Speed", self.memory_field("Speed")),
+            ("Mem Rank", self.memory_field("Rank")),
+            ("Version ID", shell_output([value.replace('"', '') for value in self.os_release("VERSION_ID")])),
+            ("Build ID", shell_output(self.os_release("BUILD_ID"))),
+            ("Kernel Release", self.read("/proc/sys/kernel/osrelease").rstrip('\n')),
+            ("Active FW ID", self.firmware_id("Active")),
+            ("Read-Only FW ID", self.firmware_id("Read-only")),
+            ("CPU Total", self.cpu_total()),
+        ]
+
+        # Policies per core group, then each group's max frequency; a missing
+        # group counts 0 policies and, as awk prints an empty field, 0.00 GHz
+        groups = self.policy_groups() + [("", 0)] * len(CORE_GROUPS)
+        fields.extend((label, str(count) if count else "0") for label, (_, count) in zip(CORE_GROUPS, groups))
+        fields.extend((label, f"{awk_number(value) / 1000000:.2f} GHz") for label, (value, _) in zip(CORE_GROUPS, groups))
+
+        fields.append(("GFX max freq", self.gfx_max_freq()))
+        fields.append(("TME enabled", self.tme_enabled() or "NO"))
+        fields.append(("CBI 2", self.cbi(2)))
+        fields.append(("CBI 6", self.cbi(6)))
+        return fields
+
+# CPU topology from one pass over the cpufreq policies and cpu nodes. A
+# policy's related_cpus, a core's core_cpus_list, a package's
+# package_cpus_list, a cache's shared_cpu_list and a NUMA node's cpulist each
+# cover many CPUs, so the reads grow with the number of cores and groups.
+class CpuTopology:
+    def __init__(self, info):
+        self.info = info
+        self.cpus = [int(name[3:]) for name in info.numbered_entries(CPU_DIR, "cpu")]
+        self.policies = []  # [(policy name, cpuinfo_max_freq, CPUs)] in policy order
+        self.max_freq = {}
+        self.core_type = {}
+        self.core = {}  # CPU -> first CPU of its physical core
+        self.package = {}
+        self.cache = {}
+        self.node = {}
+        self.read_policies()
+        if not self.cpus:
+            self.cpus = sorted(self.max_freq)  # No cpu nodes (e.g. a partial copy of sysfs): the policies' CPUs
+        self.read_cores()
+        self.read_core_types()
+        self.read_caches()
+        self.read_nodes()
+
+    # Max frequency of every policy, and of each CPU it drives
+    def read_policies(self):
+        for name in self.info.numbered_entries(f"{CPU_DIR}/cpufreq", "policy"):
+            path = f"{CPU_DIR}/cpufreq/{name}"
+            value = self.info.read(f"{path}/cpuinfo_max_freq").strip()
+            cpus = parse_cpu_list(self.info.read(f"{path}/related_cpus")) or [int(name[6:])]
+            self.policies.append((name, value, cpus))
+            for cpu in cpus:
+                self.max_freq[cpu] = value
+
+    # Physical core and package of each CPU from cpu*/topology; only CPUs outside every sibling list seen are read
+    def read_cores(self):
+        for cpu in self.cpus:
+            path = f"{CPU_DIR}/cpu{cpu}/topology"
+            if cpu not in self.core:
+                # core_cpus_list replaced thread_siblings_list in Linux 5.5
+                siblings = parse_cpu_list(self.info.read(f"{path}/core_cpus_list")
+                                          or self.info.read(f"{path}/thread_siblings_list"))
+                for sibling in siblings:
+                    self.core[sibling] = siblings[0]
+            if cpu not in self.package:
+                package_id = self.info.read(f"{path}/physical_package_id").strip()
+                if not package_id:
+                    continue
+                members = parse_cpu_list(self.info.read(f"{path}/package_cpus_list")
+                                         or self.info.read(f"{path}/core_siblings_list")) or [cpu]
+                for member in members:
+                    self.package[member] = package_id
+
+    # Number of physical cores among some CPUs; None without topology nodes
+    def core_count(self, cpus):
+        cores = {self.core[cpu] for cpu in cpus if cpu in self.core}
+        return len(cores) or None
+
+    # Core type from the Intel hybrid PMUs (two reads), else the per-CPU capacity on ARM big.LITTLE
+    def read_core_types(self):
+        for pmu, core_type in HYBRID_PMUS:
+            for cpu in parse_cpu_list(self.info.read(f"/sys/devices/{pmu}/cpus")):
+                self.core_type[cpu] = core_type
+        if self.core_type:
+            return
+        for cpu in self.cpus:
+            capacity = self.info.read(f"{CPU_DIR}/cpu{cpu}/cpu_capacity").strip()
+            if capacity:
+                self.core_type[cpu] = f"capacity {capacity}"
+
+    # Last-level cache of each CPU, e.g. "L3#0"; only CPUs outside every cache seen so far are looked at
+    def read_caches(self):
+        for cpu in self.cpus:
+            if cpu in self.cache:
+                continue
+            path = f"{CPU_DIR}/cpu{cpu}/cache"
+            indexes = [(awk_number(self.info.read(f"{path}/{index}/level")), index)
+                       for index in self.info.numbered_entries(path, "index")]
+            if not indexes:
+                continue
+            level, index = max(indexes)
+            shared = parse_cpu_list(self.info.read(f"{path}/{index}/shared_cpu_list")) or [cpu]
+            cache_id = self.info.read(f"{path}/{index}/id").strip() or str(shared[0])
+            for shared_cpu in shared:
+                self.cache[shared_cpu] = f"L{level:g}#{cache_id}"
+
+    # NUMA node of each CPU, from one cpulist per node
+    def read_nodes(self):
+        for name in self.info.numbered_entries("/sys/devices/system/node", "node"):
+            for cpu in parse_cpu_list(self.info.read(f"/sys/devices/system/node/{name}/cpulist")):
+                self.node[cpu] = name[4:]
+
+    # CPUs grouped by (max frequency, core type, last-level cache, package, NUMA node), in order of their first CPU
+    def groups(self):
+        groups = {}
+        for cpu in self.cpus:
+            key = (self.max_freq.get(cpu, ""), self.core_type.get(cpu, ""), self.cache.get(cpu, ""),
+                   self.package.get(cpu, ""), self.node.get(cpu, ""))
+            groups.setdefault(key, []).append(cpu)
+        return list(groups.items())
+
+# Fields of each host from its last collection, kept while its cache key stays the same
+class DeviceInfoCache:
+    def __init__(self, cache_dir=CACHE_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(cache_dir, CACHE_FILE), timeout=30)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS hosts (
+                host TEXT NOT NULL,
+                options TEXT NOT NULL,
+                key TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                PRIMARY KEY (host, options)
+            )""")
+
+    # Return (key, fields) of the last collection of host with these options, or None
+    def lookup(self, host, options):
+        row = self.db.execute("SELECT key, fields FROM hosts WHERE host = ? AND options = ?",
+                              (host, options)).fetchone()
+        if row is None:
+            return None
+        return row[0], [tuple(field) for field in json.loads(row[1])]
+
+    def store(self, host, options, key, fields):
+        self.db.execute("INSERT OR REPLACE INTO hosts VALUES (?, ?, ?, ?)", (host, options, key, json.dumps(fields)))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+# Function to open the cache, or return None if it is disabled or cannot be opened
+def open_cache(enabled=True):
+    if not enabled:
+        return None
+    try:
+        return DeviceInfoCache()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: cache unavailable ({e}), collecting everything", file=sys.stderr)
+        return None
+
+# Function to name the options that change the fields, as part of the cache entry
+def cache_options(args, host, privilege):
+    # privilege is who collected the fields (the effective uid here, the ssh
+    # command for a fleet host): dmidecode and ectool only answer root, so a
+    # non-root run must not hand its empty fields to a later root run
+    return json.dumps([args.root.replace("{host}", host), not args.no_tools, args.topology, privilege])
+
+# Function to collect every field of this machine
+def collect_fields(info, args):
+    fields = info.fields()
+    if args.topology:
+        fields += info.topology_fields()
+    return fields
+
+# Function to print the fields as Label,value lines
+def print_fields(fields):
+    for label, value in fields:
+        print(f"{label},{value}")
+
+# Function to read the hosts given as arguments and in the hosts file, without repeats
+def read_hosts(args):
+    hosts = list(args.hosts)
+    if args.hosts_file:
+        try:
+            with open(args.hosts_file) as f:
+                for line in f:
+                    host = line.split('#')[0].strip()
+                    if host:
+                        hosts.append(host)
+        except OSError as e:
+            print(f"Error reading hosts file {args.hosts_file}: {e}")
+            sys.exit(1)
+    return list(dict.fromkeys(hosts))
+
+# Function to build the one command run on each host: this script, read from stdin by the remote python3.
+# With cached_key, the host only checks its key and sends the fields when it differs
+def remote_command(args, host, cached_key=None):
+    command = ["python3", "-", "--format", "json", "--no-cache", "--root", args.root.replace("{host}", host)]
+    if args.no_tools:
+        command.append("--no-tools")
+    if args.topology:
+        command.append("--topology")
+    if cached_key:
+        command += ["--cached-key", cached_key]
+    return shlex.join(command)
+
+# Function to collect the fields of one host over a single connection; returns ({"key", "fields"}, error)
+async def collect_host(host, args, source, semaphore, cached_key):
+    async with semaphore:
+        command = shlex.split(args.ssh_command) + [host, remote_command(args, host, cached_key)]
+        try:
+            process = await asyncio.create_subprocess_exec(*command, stdin=asyncio.subprocess.PIPE,
+                                                           stdout=asyncio.subprocess.PIPE,
+                                                           stderr=asyncio.subprocess.PIPE,
+                                                           start_new_session=True)
+        except OSError as e:
+            return None, f"{e}"
+
+        try:
+            output, errors = await asyncio.wait_for(process.communicate(source), args.timeout)
+        except asyncio.TimeoutError:
+            # Kill the whole session: children of the command would keep its pipes open
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            return None, f"no answer after {args.timeout:g}s"
+
+    if process.returncode != 0:
+        message = errors.decode(errors="replace").strip().splitlines()
+        return None, f"exit status {process.returncode}" + (f": {message[-1]}" if message else "")
+    try:
+        return json.loads(output), None
+    except ValueError:
+        return None, "unreadable output"
+
+# Function to collect every host concurrently; returns {host: (fields, error)} in host order
+async def collect_fleet(hosts, args, cache):
+    with open(os.path.abspath(__file__), 'rb') as f:
+        source = f.read()  # Sent on stdin, so the hosts need python3 but not this script
+    cached = {host: cache.lookup(host, cache_options(args, host, args.ssh_command)) if cache else None for host in hosts}
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    replies = await asyncio.gather(*(collect_host(host, args, source, semaphore, cached[host] and cached[host][0])
+                                     for host in hosts))
+
+    # A host whose key matched sends no fields; the cached ones are reused
+    results = {}
+    reused = 0
+    for host, (reply, error) in zip(hosts, replies):
+        if reply is None:
+            results[host] = (None, error)
+        elif reply.get("fields") is not None:
+            fields = [tuple(field) for field in reply["fields"]]
+            if cache and reply.get("key"):
+                cache.store(host, cache_options(args, host, args.ssh_command), reply["key"], fields)
+            results[host] = (fields, None)
+        elif cached[host] and reply.get("key") == cached[host][0]:
+            results[host] = (cached[host][1], None)
+            reused += 1
+        else:
+            results[host] = (None, "no fields in the answer")
+    if reused:
+        print(f"# {reused} of {len(hosts)} hosts unchanged since the last run, cached fields reused", file=sys.stderr)
+    return results
+
+# Function to print one Field,host1,host2,... CSV with a column per host
+def print_fleet(results):
+    # Rows are matched by label and occurrence, as the core group labels
+    # appear twice, and hosts can have different numbers of CPU groups;
+    # a host without a row, or that failed, gets an empty cell
+    rows = {}
+    for column, (fields, _) in enumerate(results.values()):
+        seen = {}
+        for label, value in fields or ():
+            seen[label] = seen.get(label, 0) + 1
+            rows.setdefault((label, seen[label]), [""] * len(results))[column] = value
+
+    writer = csv.writer(sys.stdout, lineterminator="\n")
+    writer.writerow(["Field"] + list(results))
+    for (label, _), values in rows.items():
+        writer.writerow([label] + values)
+
+    # Report the hosts that could not be collected, after the table
+    for host, (_, error) in results.items():
+        if error is not None:
+            print(f"Error collecting {host}: {error}", file=sys.stderr)
+
+
+def main():
+    # Get the options
+    args = check_argument()
+
+    # Fleet mode: one connection per host, up to --concurrency at once
+    hosts = read_hosts(args)
+    if hosts:
+        cache = open_cache(not args.no_cache)
+        print_fleet(asyncio.run(collect_fleet(hosts, args, cache)))
+        if cache:
+            cache.close()
+        return
+
+    if not os.path.isdir(args.root):
+        print(f"Error: '{args.root}' is not a directory.")
+        sys.exit(1)
+
+    # The key is all a repeat run reads when nothing changed
+    info = DeviceInfo(args.root, tools=not args.no_tools)
+    key = info.cache_key()
+    if args.cached_key is not None and key == args.cached_key:
+        print(json.dumps({"key": key}))  # The fleet mode has these fields already
+        return
+
+    # Collect every field, then print them in the script's order
+    cache = open_cache(not args.no_cache and key is not None)
+    options = cache_options(args, "localhost", os.geteuid())
+    entry = cache.lookup("localhost", options) if cache else None
+    if entry is not None and entry[0] == key:
+        fields = entry[1]
+    else:
+        fields = collect_fields(info, args)
+        if cache:
+            cache.store("localhost", options, key, fields)
+    if cache:
+        cache.close()
+
+    if args.format == "json":
+        print(json.dumps({"key": key, "fields": fields}))
+    else:
+        print_fields(fields)
+
+if __name__ == "__main__":
+    main()
+
+
+#
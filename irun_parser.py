@@ -3,20 +3,62 @@
 # Author:       Rix Woodling
 # Created:      2024-10-15
 # Description:  Parse browserbench interactive runner html data into a table
-# Last changed: 2024-10-15, tested for Speedometer 2.1 only
+# Last changed: 2026-10-17, --aggregate splits lines like the table and keeps row order on malformed pages
 #
 
 import os
+import re
 import sys
+import glob
+import html
+import math
+import mmap
+import locale
+import argparse
+import statistics
+from array import array
 from html.parser import HTMLParser
 from collections import defaultdict
 
+from results_index import natural_sort_key
+from results_table import EXTRA_STATS, STATS, RunRecords, TableWriter
+from results_loader import load_values, print_errors
+from results_profile import add_profile_arguments, open_profiler
+
+BENCHMARK = "Speedometer2.1"
+CHUNK_SIZE = 64 * 1024  # Characters of HTML fed to the parser at a time
+
+# Byte patterns for the <pre> fast path; markup that HTMLParser reads
+# differently from a plain search (comments, script/style bodies, marked
+# sections, processing instructions) sends a page to the HTMLParser path
+_PRE_START = re.compile(rb'<pre(?=[\s/>])[^>]*>', re.IGNORECASE)
+_PRE_END = re.compile(rb'</pre\s*>', re.IGNORECASE)
+_IRREGULAR = re.compile(rb'<!--|<!\[|<\?|<script|<style', re.IGNORECASE)
+_SPACE_BYTES = b' \t\n\r\x0b\x0c'
+ITERATION_STATS = ("Avg", "Stdev", "Median", "Geomean")  # --aggregate columns
+UNITS = ("ms", "rpm")
+
 def check_argument():
     # Ensure an HTML file argument is provided.
     if len(sys.argv) < 2:
         print("Usage: python3 irun_parser.py path/to/file.html")
+        print("       python3 irun_parser.py path/to/pages/ --jobs 8")
+        print("       python3 irun_parser.py 'path/to/pages/*/iteration*.html' --stats")
+        print("       python3 irun_parser.py path/to/pages/ --aggregate")
         sys.exit(1)
-    return sys.argv[1]
+
+    parser = argparse.ArgumentParser(prog="irun_parser.py")
+    parser.add_argument("path", help="interactive runner HTML file, or a directory or glob pattern of them for one combined table")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="with a directory or glob, parse the files in N worker processes")
+    parser.add_argument("--aggregate", action="store_true",
+                        help="print N, Avg, Stdev, Median and Geomean per test, step and a/sync over every iteration of every page")
+    parser.add_argument("--stats", action="store_true",
+                        help="with a directory or glob, or --aggregate, add the Median, CV%%, Min, Max and P95 columns")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv",
+                        help="with a directory or glob, or --aggregate, print CSV rows or one JSON object per row (JSON Lines)")
+    add_profile_arguments(parser)
+    return parser.parse_args()
 
 def check_path_exists(path_arg):
     # Ensure the provided path exists and is an HTML file.
@@ -29,24 +71,78 @@ def check_path_exists(path_arg):
     return path_arg
 
 def parse_pre_content(html_file):
+    # Extract content inside the <pre> tag, without HTMLParser when the markup allows it.
+    pre_content = find_pre_content(html_file)
+    if pre_content is None:
+        pre_content = parse_pre_content_html(html_file)
+    return pre_content
+
+def find_pre_content(html_file):
+    # Fast path: find the first <pre>...</pre> in the memory-mapped bytes and
+    # unescape entities only inside it. Returns None (use HTMLParser) unless
+    # the result is certain to match parse_pre_content_html.
+    with open(html_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = _PRE_START.search(mm)
+            if start is None or b'"' in start.group() or b"'" in start.group():
+                return None  # No <pre>, or attributes that may hide a '>'
+            if start.group()[:-1].rstrip().endswith(b'/'):
+                return None  # <pre/> is an empty element to HTMLParser
+            if _IRREGULAR.search(mm, 0, start.start()):
+                return None
+            if mm.rfind(b'<', 0, start.start()) > mm.rfind(b'>', 0, start.start()):
+                return None  # The match sits inside another tag's attribute
+
+            # The first '<' after <pre> must be its end tag; anything else
+            # (nested tags, comments, no end tag) goes to HTMLParser
+            first = start.end()
+            last = mm.find(b'<', first)
+            if last < 0 or _PRE_END.match(mm, last) is None:
+                return None
+
+            # Trim the ASCII whitespace around the text before copying it out
+            while first < last and mm[first] in _SPACE_BYTES:
+                first += 1
+            while last > first and mm[last - 1] in _SPACE_BYTES:
+                last -= 1
+            with memoryview(mm) as view, view[first:last] as span:
+                try:
+                    text = str(span, locale.getpreferredencoding(False))
+                except UnicodeDecodeError:
+                    return None  # Let the text-mode read report it
+
+    # Same newlines as a text-mode read, then the same entities as HTMLParser
+    if '\r' in text:
+        text = text.replace('\r\n', '\n')
+        if '\r' in text:
+            text = text.replace('\r', '\n')
+    text = html.unescape(text)
+    if text[:1].isspace() or text[-1:].isspace():
+        text = text.strip()  # Whitespace from entities or outside ASCII
+    return text
+
+def parse_pre_content_html(html_file):
     # Extract content inside the <pre> tag from an HTML file.
-    pre_content = ""
+    fragments = []  # Text pieces of the <pre> block, joined once at the end
     recording = False  # Track if we're inside the <pre> tag
+    done = False  # Set once the <pre> tag is closed; the rest of the page is not read
 
     def handle_starttag(tag, attrs):
         nonlocal recording
-        if tag == "pre":
+        if tag == "pre" and not done:
             recording = True
 
     def handle_endtag(tag):
-        nonlocal recording
-        if tag == "pre":
+        nonlocal recording, done
+        if tag == "pre" and recording:
             recording = False
+            done = True
 
     def handle_data(data):
-        nonlocal pre_content
         if recording:
-            pre_content += data  # Collect all content inside the <pre> block
+            fragments.append(data)  # Collect all content inside the <pre> block
 
     # Create the parser and assign handlers
     parser = HTMLParser()
@@ -54,78 +150,103 @@ def parse_pre_content(html_file):
     parser.handle_endtag = handle_endtag
     parser.handle_data = handle_data
 
-    # Parse the HTML content
+    # Feed the HTML content in chunks, so only the <pre> text is held in memory
     with open(html_file, 'r') as f:
-        parser.feed(f.read())
-
-    return pre_content.strip()  # Return the content inside <pre>
-
-def replace_colons_with_commas(pre_content):
-    # Replace all colons with commas and remove surrounding whitespace.
+        while not done:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                parser.close()  # Flush text left in the parser at the end of the file
+                break
+            parser.feed(chunk)
+
+    return ''.join(fragments).strip()  # Return the content inside <pre>
+
+def is_batch_path(path_arg):
+    # A directory or a glob pattern selects many pages for one combined table.
+    return os.path.isdir(path_arg) or glob.has_magic(path_arg)
+
+def find_html_files(path_arg):
+    # Find the HTML files in a directory tree or matching a glob pattern, in natural order.
+    if os.path.isdir(path_arg):
+        paths = [os.path.join(root, name) for root, _, files in os.walk(path_arg) for name in files if name.endswith(".html")]
+    else:
+        paths = [path for path in glob.glob(path_arg, recursive=True) if path.endswith(".html") and os.path.isfile(path)]
+
+    if not paths:
+        print(f"Error: No HTML files found in '{path_arg}'.")
+        sys.exit(1)
+    return sorted(paths, key=natural_sort_key)  # page2 before page10
+
+def parse_value(item):
+    # Split a value like '45.1234 ms' into a float and its unit suffix.
+    for suffix in [' ms', ' rpm']:  # Add more suffixes as needed
+        if item.endswith(suffix):
+            try:
+                return float(item[:-len(suffix)].strip()), suffix
+            except ValueError as e:
+                print(f"Warning: error rounding item '{item}': {e}", file=sys.stderr)  # Kept out of the table
+            break  # Stop checking suffixes once a match is found
+
+    # Values without a known unit are kept verbatim in the unit column
+    return math.nan, item
+
+def parse_records(pre_content, source, texts=None):
+    """Turn each 'test : step : a/sync : value' line into a run record."""
+    records = RunRecords()
     lines = pre_content.splitlines()
-    updated_lines = []
-
-    for line in lines:
-        # Split by colon and join with commas, removing extra whitespace
-        parts = [part.strip() for part in line.split(':')]
-        updated_lines.append(','.join(parts))
 
-    return updated_lines  # Return list of updated lines
+    # The last line of each test is printed as test,,,value; find it up front
+    last_lines = {line.split(':', 1)[0].strip(): i for i, line in enumerate(lines)} if texts is not None else {}
 
-def group_lines_by_first_value(lines):
-    # Group lines into sublists based on the first CSV value.
+    for i, line in enumerate(lines):
+        # Split by colon, removing extra whitespace
+        parts = [part.strip() for part in line.split(':')]
+        value, unit = parse_value(parts[-1]) if len(parts) > 1 else (math.nan, '')
+
+        # Test totals ('test : value') have no step, so their metric is empty
+        records.append(BENCHMARK, parts[0], None, ':'.join(parts[1:-1]), value, source, unit)
+
+        # Keep the printed line of the few rows that are not test,step,a/sync,value
+        # or a test's last total, e.g. the totals of earlier iterations
+        if texts is not None and len(parts) > 1:
+            last = last_lines[parts[0]] == i
+            if len(parts) != (2 if last else 4):
+                texts[len(records) - 1] = ','.join(page_line_columns(parts, last))
+
+    return records
+
+def page_line_columns(parts, last):
+    # Columns of an irregular line: a test's last line moves to the value column, and the fourth column is rounded.
+    columns = [parts[0], '', ''] + parts[1:] if last else list(parts)
+    if len(columns) > 3:
+        value, unit = parse_value(columns[3])
+        if not math.isnan(value):
+            columns[3] = f"{value:.2f}{unit}"
+    return columns
+
+def group_records_by_test(records, texts=None):
+    # Group (record, printed line or None) pairs into sublists by test, in the order tests first appear.
     grouped_content = defaultdict(list)
+    texts = texts or {}
 
-    # Group lines by the first value in each line (CSV format)
-    for line in lines:
-        first_value = line.split(',')[0]
-        grouped_content[first_value].append(line)
-
-    grouped_sublists = []
+    for i, record in enumerate(records):
+        grouped_content[record.config].append((record, texts.get(i)))
 
-    # Modify the last item in each group and add the group to the final list
-    for group in grouped_content.values():
-        if group:
-            # Modify the last item in the group
-            last_item_parts = group[-1].split(',', 1)
-            modified_last_item = f"{last_item_parts[0]},,,{last_item_parts[1]}"
-            group[-1] = modified_last_item
+    return list(grouped_content.values())
 
-        grouped_sublists.append(group)  # Add the group without a blank line
+def record_columns(record, text=None):
+    # Format a record as its output columns: test, step, a/sync, value.
+    if text is not None:
+        return [text]  # Already formatted by parse_records
+    if math.isnan(record.value):
+        value = record.unit
+    else:
+        value = f"{record.value:.2f}{record.unit}"  # Rounded to 2 decimal places with the suffix
 
-    return grouped_sublists
-
-def split_into_nested_sublists(grouped_sublists):
-    """Split each item in the grouped sublists into nested sublists."""
-    nested_sublists = []
-
-    # Loop through each group
-    for group in grouped_sublists:
-        nested_group = [line.split(',') for line in group]  # Split each line by ','
-        nested_sublists.append(nested_group)  # Add the nested group to the list
-
-    return nested_sublists
-
-def round_third_item_in_nested_sublists(nested_sublists):
-    """Round the fourth item (index 3) in each nested sublist to the nearest hundredth."""
-    for group in nested_sublists:
-        for sub in group:
-            if len(sub) > 3:
-                item = sub[3]
-                # Check if the item has any suffix (e.g., ' ms', ' rpm')
-                for suffix in [' ms', ' rpm']:  # Add more suffixes as needed
-                    if item.endswith(suffix):
-                        try:
-                            # Remove the suffix and strip any extra spaces
-                            number_str = item.replace(suffix, '').strip()
-                            # Convert to float and round to 2 decimal places
-                            rounded_number = f"{float(number_str):.2f}"
-                            # Reassemble the rounded number with the suffix
-                            sub[3] = f"{rounded_number}{suffix}"
-                        except ValueError as e:
-                            print(f"Error rounding item '{item}': {e}")  # Debug if needed
-                        break  # Stop checking suffixes once a match is found
-    return nested_sublists
+    # Totals leave the step and a/sync columns empty
+    if not record.metric:
+        return [record.config, '', '', value]
+    return [record.config] + record.metric.split(':') + [value]
 
 def filter_out_last_four_sublists(nested_sublists):
     # Filter out the last four nested sublists from the output.
@@ -133,69 +254,239 @@ def filter_out_last_four_sublists(nested_sublists):
         return nested_sublists[:-4]  # Exclude the last four sublists
     return []  # If there are 4 or fewer sublists, return an empty list
 
+def load_page(html_file):
+    # Parse one page into (test, step, a/sync, unit, value) rows; runs in the batch worker processes.
+    pre_content = parse_pre_content(html_file)
+    if not pre_content:
+        raise ValueError("no <pre> content found")
+    records = parse_records(pre_content, html_file)
+
+    rows = []
+    for record in records:
+        step, sync = record.metric.split(':') if record.metric else ('', '')
+        unit = '' if math.isnan(record.value) else record.unit.strip()
+        rows.append((record.config, step, sync, unit, record.value))
+    return rows
+
+def combine_pages(pages):
+    # Build one row per test, step and a/sync with a column per page, in the order rows first appear.
+    # A page with several iterations of a row contributes their mean; a row
+    # missing from a page (or a page that failed) leaves its column empty.
+    per_page = {}
+    units = {}
+    for i, page in enumerate(pages):
+        for test, step, sync, unit, value in page or ():
+            labels = (test, step, sync)
+            columns = per_page.get(labels)
+            if columns is None:
+                columns = per_page[labels] = [[] for _ in pages]
+            if not math.isnan(value):
+                columns[i].append(value)
+            if unit:
+                units.setdefault(labels, unit)
+
+    return [(labels + (units.get(labels, ''),),
+             array('d', (statistics.fmean(values) if values else math.nan for values in columns)))
+            for labels, columns in per_page.items()]
+
+def parse_iterations(pre_content):
+    # Collect the values of every line into one array per unit, for each test, step and a/sync across all iterations.
+    # Lines are only split at their last ':' while grouping, as parse_records
+    # splits them; the labels are split and the values converted once per
+    # distinct line, not per iteration. A line whose values are all malformed
+    # is still listed (with no units), so it keeps its row position.
+    values_by_label = {}
+    for line in pre_content.split('\n'):
+        label, separator, value = line.rpartition(':')
+        if separator:
+            values = values_by_label.get(label)
+            if values is None:
+                values = values_by_label[label] = []
+            values.append(value.strip())
+
+    lines = {}
+    for label, values in values_by_label.items():
+        parts = [part.strip() for part in label.split(':')]
+        if len(parts) == 3:
+            test, step, sync = parts
+        else:
+            test, step, sync = parts[0], ':'.join(parts[1:]), ''  # Totals have no step
+        units = lines.setdefault((test, step, sync), {})
+        for unit, numbers in line_values(values):
+            if unit in units:
+                units[unit].extend(numbers)
+            else:
+                units[unit] = numbers
+    return list(lines.items())
+
+def line_values(values):
+    # Convert the '12.5 ms' values of one line into [(unit, array of floats)]; values without a number are skipped.
+    converted = []
+    remaining = len(values)
+    for unit in UNITS:
+        if not remaining:
+            break  # Every value had one of the units seen so far
+        suffix = ' ' + unit
+        numbers = [value[:-len(suffix)] for value in values if value.endswith(suffix)]
+        if not numbers:
+            continue
+        remaining -= len(numbers)
+        try:
+            converted.append((unit, array('d', map(float, numbers))))
+        except ValueError:
+            # Some iteration has text instead of a number; convert one by one
+            floats = array('d')
+            for number in numbers:
+                try:
+                    floats.append(float(number))
+                except ValueError:
+                    pass
+            converted.append((unit, floats))
+    return converted
+
+def load_iterations(html_file):
+    # Parse one page for --aggregate; runs in the batch worker processes.
+    pre_content = parse_pre_content(html_file)
+    if not pre_content:
+        raise ValueError("no <pre> content found")
+    return parse_iterations(pre_content)
+
+def merge_iterations(pages):
+    # Join the per-unit arrays of every page into ((test, step, a/sync, unit), values) rows, in the order lines first appear.
+    merged = {}
+    for page in pages:
+        for labels, units in page or ():
+            merged_units = merged.setdefault(labels, {})
+            for unit, values in units.items():
+                if unit in merged_units:
+                    merged_units[unit].extend(values)
+                else:
+                    merged_units[unit] = values
+    return [(labels + (unit,), values) for labels, units in merged.items() for unit, values in units.items()]
+
 def print_header():
     # Print the header for the output.
     header = ['test', 'step', 'a/sync', 'value']
     print(','.join(header))  # Join and print the header with commas
 
 def print_nested_sublists(nested_sublists):
-    # Print each nested sublist, joining items with commas.
+    # Print each record of each group, joining columns with commas.
     for i, group in enumerate(nested_sublists):
-        for sub in group:
-            print(','.join(sub))  # Join each sublist with commas and print
+        for record, text in group:
+            print(','.join(record_columns(record, text)))  # Join each record's columns with commas and print
 
         # Add a blank line only between groups (not after the last group)
         if i < len(nested_sublists) - 1:
             print()
 
 def print_last_item_of_each_sublist(nested_sublists):
-    # Print the last item from each nested sublist.
+    # Print the last record from each group.
     for group in nested_sublists:
         if group:  # Ensure the group is not empty
-            last_item = group[-1]  # Get the last item of the current group
-            print(','.join(last_item))  # Print the last item joined by commas
-
-
+            last_item = group[-1]  # Get the last record of the current group
+            print(','.join(record_columns(*last_item)))  # Print the last record joined by commas
+
+
+
+def main_batch(args):
+    # With --profile, time each stage below and report it on exit (stdout is untouched)
+    profiler = open_profiler(args)
+
+    # Find the pages, one column each
+    with profiler.stage("scan") as stage:
+        paths = find_html_files(args.path)
+        stage.files = len(paths)
+    for i, path in enumerate(paths, 1):
+        print(f"R{i}: {path}", file=sys.stderr)  # Which page each column comes from
+
+    # Parse the pages in worker processes, in path order
+    with profiler.stage("parse") as stage:
+        pages, errors = load_values(paths, load_page, jobs=args.jobs)
+        groups = combine_pages(pages)
+        stage.files = len(paths)
+
+    # One test,step,a/sync,unit,R1..Rn row per line, with the mean and stdev across pages
+    with profiler.stage("emit"):
+        stat_names = STATS if args.stats else ("Avg", "Stdev")
+        writer = TableWriter(["test", "step", "a/sync", "unit"], stat_names=stat_names, output_format=args.format)
+        writer.write_rows(groups)
+
+    # Report the pages that could not be parsed, after the table
+    print_errors(errors)
+
+def main_aggregate(args):
+    # With --profile, time each stage below and report it on exit (stdout is untouched)
+    profiler = open_profiler(args)
+
+    # One page, or every page of a directory or glob
+    with profiler.stage("scan") as stage:
+        paths = find_html_files(args.path) if is_batch_path(args.path) else [check_path_exists(args.path)]
+        stage.files = len(paths)
+
+    # Parse the pages in worker processes into one value array per line
+    with profiler.stage("parse") as stage:
+        pages, errors = load_values(paths, load_iterations, jobs=args.jobs)
+        lines = merge_iterations(pages)
+        stage.files = len(paths)
+
+    # One test,step,a/sync,unit,N row per line; the statistics of all rows
+    # are computed in one vectorized pass over the lines x iterations matrix
+    with profiler.stage("emit"):
+        stat_names = STATS + EXTRA_STATS if args.stats else ITERATION_STATS
+        writer = TableWriter(["test", "step", "a/sync", "unit", "N"], stat_names=stat_names,
+                             output_format=args.format, runs=False)
+        writer.write_rows([(key + (len(values),), values) for key, values in lines])
+
+    # Report the pages that could not be parsed, after the table
+    print_errors(errors)
 
 def main():
     # Get the argument and validate the path
-    path_arg = check_path_exists(check_argument())
+    args = check_argument()
+    if args.aggregate:
+        main_aggregate(args)
+        return
+    if is_batch_path(args.path):
+        main_batch(args)
+        return
+    path_arg = check_path_exists(args.path)
 #    print(path_arg)
 
+    # With --profile, time each stage below and report it on exit (stdout is untouched)
+    profiler = open_profiler(args)
+
     # Parse the HTML file for <pre> tag content
-    pre_content = parse_pre_content(path_arg)
+    with profiler.stage("read") as stage:
+        pre_content = parse_pre_content(path_arg)
+        stage.files = 1
 #    print(pre_content)
 
-    # Replace colons with commas in the content
-    updated_lines = replace_colons_with_commas(pre_content)
-#    print(updated_lines)
+    # Parse each line into a run record with a numeric value
+    with profiler.stage("parse"):
+        texts = {}
+        records = parse_records(pre_content, path_arg, texts)
+#    print(list(records))
 
-    # Group lines by the first CSV value
-    grouped_lines = group_lines_by_first_value(updated_lines)
-#    print(grouped_lines)
-
-    # Split the grouped lines into nested sublists
-    nested_sublists = split_into_nested_sublists(grouped_lines)
+    # Group the records by test
+    with profiler.stage("group"):
+        nested_sublists = group_records_by_test(records, texts)
 #    print(nested_sublists)
 
-    # Round the third item (index 3) in each nested sublist
-    rounded_sublists = round_third_item_in_nested_sublists(nested_sublists)
-#    print(rounded_sublists)
-
     # Filter out the last four sublists
-    filtered_sublists = filter_out_last_four_sublists(rounded_sublists)
+    filtered_sublists = filter_out_last_four_sublists(nested_sublists)
 #    print(filtered_sublists)
 
 # ->|
-    print_header()
+    with profiler.stage("emit"):
+        print_header()
 
-    print_nested_sublists(filtered_sublists)
+        print_nested_sublists(filtered_sublists)
 
-    print("")
+        print("")
 
-    print_last_item_of_each_sublist(nested_sublists)
+        print_last_item_of_each_sublist(nested_sublists)
 
-    print("")
+        print("")
 # ->|
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Read result files straight out of .tar(.gz/.bz2/.xz) and .zip archives
+# Last changed: 2026-10-17, tar members are listed first and read back in archive order, one at a time
+#
+
+import sys
+import time
+import tarfile
+import zipfile
+import posixpath
+
+# Function to check whether a file is an archive the parsers can read
+def is_archive(path):
+    try:
+        return zipfile.is_zipfile(path) or tarfile.is_tarfile(path)
+    except OSError:
+        return False
+
+# Reader for the result files inside one archive, without extracting anything to disk
+class ArchiveReader:
+    # Member paths are shown as "<archive>/<member>" (e.g. sweep.tar.gz/cfgA/
+    # run1/.../results-chart.json) so they group, sort and appear in error
+    # messages just like paths on disk. A zip archive has a central directory,
+    # so only the members asked for are decompressed, one at a time. A tar
+    # archive has no index and a compressed one can only be read front to
+    # back, so it is streamed once to list the matching members and again
+    # while they are read, handing each one over as the stream passes it.
+    def __init__(self, archive_path, filename):
+        self.archive_path = archive_path
+        self.zip = None
+        self.members = {}  # Shown path -> zip member name, or position of the (last) tar member
+        self.mtimes = {}   # Shown path -> member modification time (seconds since the epoch)
+
+        try:
+            if zipfile.is_zipfile(archive_path):
+                self.zip = zipfile.ZipFile(archive_path)
+                for info in self.zip.infolist():
+                    if not info.is_dir() and posixpath.basename(info.filename) == filename:
+                        path = self._shown_path(info.filename)
+                        self.members[path] = info.filename
+                        self.mtimes[path] = time.mktime(info.date_time + (0, 0, -1))  # Zip times are local
+                self.paths = list(self.members)
+            else:
+                for position, member, _ in self._tar_members():
+                    if member.isfile() and posixpath.basename(member.name) == filename:
+                        path = self._shown_path(member.name)
+                        self.members[path] = position
+                        self.mtimes[path] = member.mtime
+                self.paths = list(self.members)
+        except (OSError, EOFError, tarfile.TarError, zipfile.BadZipFile) as e:
+            self._fail(e)
+
+    # Report an unreadable archive and stop
+    def _fail(self, error):
+        print(f"Error reading archive {self.archive_path}: {error}")
+        sys.exit(1)
+
+    # Yield (position, member, tar) for every tar member, with the tar still open
+    def _tar_members(self):
+        # "r|*" reads the stream sequentially, whatever the compression
+        with tarfile.open(self.archive_path, mode="r|*") as tar:
+            for position, member in enumerate(tar):
+                yield position, member, tar
+
+    # Turn a member name into the path shown in the table and errors
+    def _shown_path(self, name):
+        return posixpath.join(self.archive_path, posixpath.normpath(name).lstrip('/'))
+
+    # Yield (path, bytes) for the given members, in the order the archive stores them
+    def read(self, paths):
+        try:
+            if self.zip is not None:
+                for path in paths:
+                    yield path, self.zip.read(self.members[path])
+                return
+            # Only one member's bytes are held at a time; a tar path that occurs
+            # more than once is read from its last copy, as listed above
+            wanted = {self.members[path]: path for path in paths}
+            for position, member, tar in self._tar_members():
+                if position in wanted:
+                    yield wanted.pop(position), tar.extractfile(member).read()
+                if not wanted:
+                    break
+        except (OSError, EOFError, tarfile.TarError, zipfile.BadZipFile) as e:
+            self._fail(e)
+
+    def close(self):
+        if self.zip is not None:
+            self.zip.close()
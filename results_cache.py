@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  On-disk cache of values extracted from results JSON files
+# Last changed: 2026-10-17, commit between batches of a watch
+#
+
+import os
+import sys
+import json
+import time
+import sqlite3
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "data-parsers")
+CACHE_FILE = "parse_cache.sqlite"
+MAX_CACHE_BYTES = 64 * 1024 * 1024  # Evict least recently used entries beyond this size
+
+# Function to get the identity of a file, or None if it cannot be stat'ed
+def file_identity(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+# Cache of extracted values, one entry per (path, spec)
+class ParseCache:
+    # spec names what was extracted (e.g. "tast:Benchmark.Speedometer3.Score"),
+    # so the same file can be cached for several keys at once
+    def __init__(self, spec, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.spec = spec
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(cache_dir, CACHE_FILE), timeout=30)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                path TEXT NOT NULL,
+                spec TEXT NOT NULL,
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                value TEXT,
+                error TEXT,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (path, spec)
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+    # Look up every path; returns {index: (value, error)} for hits and {index: identity} for misses
+    def lookup(self, paths):
+        hits = {}
+        misses = {}
+        now = time.time()
+
+        for i, path in enumerate(paths):
+            identity = file_identity(path)
+            row = None
+            if identity is not None:
+                row = self.db.execute(
+                    "SELECT inode, size, mtime_ns, value, error FROM entries WHERE path = ? AND spec = ?",
+                    (path, self.spec)).fetchone()
+
+            # A hit only counts if the file is still the one that was parsed
+            if row is not None and tuple(row[:3]) == identity:
+                value = json.loads(row[3]) if row[3] is not None else None
+                hits[i] = (value, row[4])
+            else:
+                misses[i] = identity
+
+        self.db.executemany("UPDATE entries SET last_used = ? WHERE path = ? AND spec = ?",
+                            [(now, paths[i], self.spec) for i in hits])
+        return hits, misses
+
+    # Store freshly extracted values; entries are (path, identity, value, error)
+    def store(self, entries):
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(path, self.spec, *identity, json.dumps(value) if value is not None else None, error, now)
+             for path, identity, value, error in entries if identity is not None])
+
+    # Commit what has been stored so far, e.g. between batches of a long-running watch
+    def commit(self):
+        self.db.commit()
+
+    # Drop the least recently used entries once the database outgrows max_bytes
+    def evict(self):
+        page_count = self.db.execute("PRAGMA page_count").fetchone()[0]
+        page_size = self.db.execute("PRAGMA page_size").fetchone()[0]
+        used_bytes = page_count * page_size
+        if used_bytes <= self.max_bytes:
+            return
+
+        # Shrink to 80% of the limit so eviction does not run on every call
+        rows = self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = rows - int(rows * self.max_bytes * 0.8 / used_bytes)
+        self.db.execute(
+            "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY last_used LIMIT ?)",
+            (excess,))
+        self.db.commit()
+        self.db.execute("VACUUM")
+
+    # Commit, evict if needed and close the database
+    def close(self):
+        self.db.commit()
+        self.evict()
+        self.db.close()
+
+# Function to open the cache, or return None (with a warning) when it is unavailable
+def open_cache(spec, enabled=True):
+    if not enabled:
+        return None
+    try:
+        return ParseCache(spec)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: parse cache disabled: {e}", file=sys.stderr)
+        return None
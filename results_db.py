@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Ingest parsed runs into a SQLite results index and query tables from it
+# Last changed: 2026-10-17, single-path labels; archive sources are stored with an absolute archive path
+#
+
+import os
+import re
+import sys
+import time
+import sqlite3
+import argparse
+import datetime
+
+import tast_parser
+import crossmark_parser
+from results_index import PathIndex, natural_sort_key
+from results_cache import open_cache
+from results_archive import ArchiveReader
+from results_table import STATS, TableWriter
+from results_loader import print_errors
+
+DB_DIR = os.path.join(os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share")), "data-parsers")
+DB_FILE = os.path.join(DB_DIR, "results_index.sqlite")
+
+# Relative --last periods, e.g. "30d" or "4w"
+_PERIOD = re.compile(r'^(\d+)([dw])$')
+_PERIOD_DAYS = {"d": 1, "w": 7}
+
+# Function to check if the arguments are provided and read the command
+def check_argument():
+    if len(sys.argv) < 2:
+        print("# how to use")
+        print("python3 results_db.py ingest path/to/tast_tests/speedometer3_sweep/")
+        print("python3 results_db.py ingest path/to/speedometer3.0/ --jobs 8")
+        print("python3 results_db.py query --benchmark Speedometer3 --last 30d")
+        print("python3 results_db.py query --benchmark Speedometer3 --config cfgA --since 2026-09-01 --stats")
+        sys.exit(1)  # Exit if no argument is provided
+
+    parser = argparse.ArgumentParser(prog="results_db.py")
+    parser.add_argument("--db", default=DB_FILE, metavar="FILE",
+                        help=f"results index database (default: {DB_FILE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="parse results trees or archives and upsert their runs")
+    ingest.add_argument("paths", nargs="+", help="tast or crossbench results directories, or .tar/.zip archives of them")
+    ingest.add_argument("--parser", choices=("auto", "tast", "crossmark"), default="auto",
+                        help="which parser reads the tree (default: crossmark for speedometer3.0 paths, else tast)")
+    ingest.add_argument("--all-metrics", action="store_true",
+                        help="store every Benchmark.*.Score key of the tast results, not just the path's benchmark")
+    ingest.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="load result files in N worker processes")
+    ingest.add_argument("--no-cache", action="store_true",
+                        help="read every file instead of reusing the parse cache in ~/.cache")
+
+    query = commands.add_parser("query", help="print the R1..Rn/Avg table from the index")
+    query.add_argument("--benchmark", metavar="NAME",
+                       help="benchmark as labelled in the tables, e.g. Speedometer3 or 'Speedometer 3.0'")
+    query.add_argument("--config", action="append", default=[], metavar="CONFIG",
+                       help="only these configs (repeatable)")
+    query.add_argument("--since", type=parse_date, metavar="YYYY-MM-DD",
+                       help="only runs whose result file is from this day or later")
+    query.add_argument("--until", type=parse_date, metavar="YYYY-MM-DD",
+                       help="only runs whose result file is from before this day")
+    query.add_argument("--last", type=parse_period, metavar="PERIOD",
+                       help="only runs from the last PERIOD, e.g. 30d or 4w")
+    query.add_argument("--stats", action="store_true",
+                       help="add Median, Stdev, CV%%, Min, Max and P95 columns after Avg")
+    query.add_argument("--format", choices=("csv", "jsonl"), default="csv",
+                       help="print CSV rows, or one JSON object per row (JSON Lines)")
+    return parser.parse_args()
+
+# Function to read a YYYY-MM-DD date as a local midnight timestamp
+def parse_date(text):
+    try:
+        return time.mktime(datetime.date.fromisoformat(text).timetuple())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {text}")
+
+# Function to read a relative period (e.g. "30d") as a number of seconds
+def parse_period(text):
+    match = _PERIOD.match(text)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"not a period like 30d or 4w: {text}")
+    return int(match.group(1)) * _PERIOD_DAYS[match.group(2)] * 86400
+
+# Function to open the results index, creating the table on first use
+def open_db(db_file):
+    os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+    db = sqlite3.connect(db_file, timeout=30)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS runs (
+            benchmark TEXT NOT NULL,
+            config TEXT NOT NULL,
+            run_id TEXT NOT NULL,
+            source TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            value REAL NOT NULL,
+            run_time REAL NOT NULL,
+            ingested REAL NOT NULL,
+            PRIMARY KEY (benchmark, config, run_id, source)
+        )""")
+    # Queries select one benchmark, optionally some configs, over a time range
+    db.execute("CREATE INDEX IF NOT EXISTS runs_lookup ON runs (benchmark, config, run_time)")
+    return db
+
+# Function to scan one tast tree or archive and yield its run records, one header at a time
+def scan_tast(path, all_metrics, errors, jobs=1, use_cache=True):
+    reader = None
+    read = None
+    if os.path.isfile(path):
+        reader = ArchiveReader(path, "results-chart.json")
+        results = reader.paths
+        read = reader.read
+    else:
+        results = tast_parser.find_results_json(path)
+    index = PathIndex(results, os.path.basename(os.path.normpath(path)))
+
+    # Archive members have no inode or mtime to check, so they skip the parse cache
+    use_cache = use_cache and reader is None
+    if all_metrics:
+        cache = open_cache("tast:all:", use_cache)
+        records, metric_errors = tast_parser.parse_all_metrics(index, [], jobs, cache, read)
+        errors.extend(metric_errors)
+        yield records, reader
+    else:
+        json_key = tast_parser.process_based_on_argument(path)
+        cache = open_cache(f"tast:{json_key}", use_cache)
+        for _, records in tast_parser.parse_data(index, json_key, errors, jobs, cache, read):
+            yield records, reader
+    if cache is not None:
+        cache.close()
+
+# Function to scan one crossbench tree or archive and yield its run records, one group at a time
+def scan_crossmark(path, errors, jobs=1, use_cache=True):
+    json_file = crossmark_parser.get_target_filename(path)
+    reader = None
+    read = None
+    if os.path.isfile(path):
+        reader = ArchiveReader(path, json_file)
+        results = crossmark_parser.keep_shallowest(reader.paths)
+        read = reader.read
+    else:
+        results = crossmark_parser.find_shallowest_results_json(path, json_file, required=False)
+    index = PathIndex(results, os.path.basename(os.path.normpath(path)))
+
+    cache = open_cache("crossmark:Score", use_cache and reader is None)
+    for _, records in crossmark_parser.parse_data_from_json_files(index, json_file, errors, jobs=jobs, cache=cache, read=read):
+        yield records, reader
+    if cache is not None:
+        cache.close()
+
+# Function to parse each path and upsert its runs into the index
+def ingest(db, args):
+    errors = []
+    total = 0
+
+    for path in args.paths:
+        # Check if the path exists; archives and directories are both accepted
+        tast_parser.check_path_exists(path)
+        kind = args.parser
+        if kind == "auto":
+            kind = "crossmark" if "speedometer3.0" in path else "tast"
+
+        if kind == "crossmark":
+            batches = scan_crossmark(path, errors, args.jobs, not args.no_cache)
+        else:
+            batches = scan_tast(path, args.all_metrics, errors, args.jobs, not args.no_cache)
+
+        now = time.time()
+        count = 0
+        for records, reader in batches:
+            rows = []
+            for record in records:
+                # The run time is when the result file was written, so a sweep
+                # ingested later still lands in the right period
+                if reader is not None:
+                    # "<archive>/<member>", with the archive part made absolute
+                    # so ingesting from another directory updates the same rows
+                    run_time = reader.mtimes[record.source]
+                    source = os.path.abspath(reader.archive_path) + record.source[len(reader.archive_path):]
+                else:
+                    run_time = os.stat(record.source).st_mtime
+                    source = os.path.abspath(record.source)
+                rows.append((record.benchmark, record.config, record.run_id, source,
+                             record.metric, record.value, run_time, now))
+
+            # Upsert on (benchmark, config, run id, source): re-ingesting a tree
+            # updates its runs instead of adding them twice
+            db.executemany("""
+                INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (benchmark, config, run_id, source) DO UPDATE SET
+                    metric = excluded.metric, value = excluded.value,
+                    run_time = excluded.run_time, ingested = excluded.ingested""", rows)
+            count += len(rows)
+
+        db.commit()
+        total += count
+        print(f"Ingested {count} runs from {path}", file=sys.stderr)
+
+    print_errors(errors)
+    print(f"{total} runs ingested into {args.db}", file=sys.stderr)
+
+# Function to print the padded R1..Rn/Avg table for one benchmark from the index
+def query(db, args):
+    benchmarks = [row[0] for row in db.execute("SELECT DISTINCT benchmark FROM runs ORDER BY benchmark")]
+    benchmark = args.benchmark
+    if benchmark is None and len(benchmarks) == 1:
+        benchmark = benchmarks[0]
+    if benchmark not in benchmarks:
+        print(f"Please select a benchmark with --benchmark: {', '.join(benchmarks) or 'the index is empty'}")
+        sys.exit(1)
+
+    # Build the WHERE clause from the filters that were given
+    where = ["benchmark = ?"]
+    params = [benchmark]
+    if args.config:
+        where.append(f"config IN ({', '.join('?' * len(args.config))})")
+        params.extend(args.config)
+    if args.last is not None:
+        where.append("run_time >= ?")
+        params.append(time.time() - args.last)
+    if args.since is not None:
+        where.append("run_time >= ?")
+        params.append(args.since)
+    if args.until is not None:
+        where.append("run_time < ?")
+        params.append(args.until)
+
+    # Group the runs by config, in the parsers' run order (run2 before run10)
+    groups = {}
+    for config, run_id, source, value in db.execute(
+            f"SELECT config, run_id, source, value FROM runs WHERE {' AND '.join(where)}", params):
+        groups.setdefault(config, []).append((natural_sort_key(run_id), source, value))
+
+    # Configs sorted by length then value, as the parsers sort their headers
+    configs = sorted(groups, key=lambda x: (len(x), x))
+    width = max((len(runs) for runs in groups.values()), default=0)
+    stat_names = STATS if args.stats else ("Avg",)
+    writer = TableWriter([benchmark], width, stat_names, args.format)
+    for config in configs:
+        writer.write_row((config,), [value for _, _, value in sorted(groups[config])])
+
+
+def main():
+    # Get the arguments and check if they're valid
+    args = check_argument()
+
+    db = open_db(args.db)
+    if args.command == "ingest":
+        ingest(db, args)
+    else:
+        query(db, args)
+    db.close()
+
+if __name__ == "__main__":
+    main()
+
+
+#
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Path trie index shared by the tast and crossmark parsers
+# Last changed: 2026-10-17, one group named by a label when there is a single result file
+#
+
+import re
+
+_DIGITS = re.compile(r'(\d+)')
+_LEAF = None  # Trie key holding the indices of paths that end at a node
+
+# Function to build a natural sort key so "run2" sorts before "run10"
+def natural_sort_key(text):
+    parts = _DIGITS.split(text)
+    # re.split with a capture group puts the digit runs at the odd positions
+    parts[1::2] = [int(part) for part in parts[1::2]]
+    return tuple(parts)
+
+# Index of result paths, built once from the scan output
+class PathIndex:
+    # label names the group when no two paths differ (a single result file);
+    # it defaults to the name of the directory holding that file
+    def __init__(self, paths, label=None):
+        self.paths = list(paths)
+
+        # Split every path exactly once
+        self.components = [path.split('/') for path in self.paths]
+
+        # Build a trie of path components, e.g. {'': {'data': {'cfgA': {...}}}}
+        self.root = {}
+        for i, parts in enumerate(self.components):
+            node = self.root
+            for part in parts:
+                node = node.setdefault(part, {})
+            node.setdefault(_LEAF, []).append(i)
+
+        self.varying_column, branch = self._find_branch()
+
+        # Headers are the children of the first branching node, sorted by length then value
+        if branch is None:
+            self.headers = []
+            if self.paths:
+                # Nothing varies, so every path is one run of one group
+                parts = self.components[0]
+                self.headers = [label or (parts[-2] if len(parts) > 1 else parts[0])]
+                self.groups = {self.headers[0]: list(self.paths)}
+                self.run_ids = {}
+                self.sorted_paths = list(self.paths)
+                return
+        else:
+            self.headers = sorted((key for key in branch if key is not _LEAF), key=lambda x: (len(x), x))
+
+        # Group the paths under each header and order the runs inside each group
+        self.run_ids = {}
+        self.groups = {}
+        for header in self.headers:
+            self.groups[header] = self._sort_group(self._collect(branch[header]))
+
+        self.sorted_paths = [path for group in self.groups.values() for path in group]
+
+    # Walk down the single-child chain to the first node where the paths diverge
+    def _find_branch(self):
+        node = self.root
+        depth = 0
+        while len(node) == 1:
+            key = next(iter(node))
+            if key is _LEAF:
+                return None, None  # Every path is identical
+            node = node[key]
+            depth += 1
+
+        if not node:
+            return None, None  # No paths at all
+
+        # Column numbers are 1-based, counting the empty component before a leading "/"
+        return depth + 1, node
+
+    # Collect the indices of every path below a trie node
+    def _collect(self, node):
+        indices = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for key, child in current.items():
+                if key is _LEAF:
+                    indices.extend(child)
+                else:
+                    stack.append(child)
+        indices.sort()  # Keep scan order for paths that compare equal
+        return indices
+
+    # Sort one group by the last path component that differs between its paths
+    def _sort_group(self, indices):
+        if len(indices) == 1:
+            return [self.paths[indices[0]]]
+
+        shortest = min(len(self.components[i]) for i in indices)
+
+        # Compare components starting from the end, moving backwards (e.g. run1, run2)
+        for offset in range(1, shortest + 1):
+            column = {i: self.components[i][-offset] for i in indices}
+            if len(set(column.values())) > 1:
+                keys = {i: natural_sort_key(value) for i, value in column.items()}
+                for i, value in column.items():
+                    self.run_ids[self.paths[i]] = value
+                return [self.paths[i] for i in sorted(indices, key=keys.__getitem__)]
+
+        # If all components are identical, keep the scan order
+        return [self.paths[i] for i in indices]
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Load values from results JSON files for the tast and crossmark parsers
+# Last changed: 2026-10-17, archive members are parsed in the order the archive stores them
+#
+
+import os
+import re
+import sys
+import json
+import mmap
+import itertools
+import collections
+from concurrent.futures import ProcessPoolExecutor
+
+# Optional fast JSON decoders; the stdlib json module is always available
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Errors that mean a single file could not be parsed, not that the run failed
+LOAD_ERRORS = (KeyError, IndexError, TypeError, StopIteration, OSError, ValueError)
+
+# Tokens the streaming extractor cares about: strings (possibly cut off at
+# the end of the buffer, in which case group 1 is None) and brackets. Numbers,
+# commas and colons are skipped by the regex engine without a Python step.
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*(?:(")|\\?\Z)|[{}\[\]]')
+_COLON = re.compile(r'\s*:\s*')
+_SPACE = re.compile(r'\s*')
+_DECODER = json.JSONDecoder()
+_DELIMITERS = ',}] \t\r\n'
+CHUNK_SIZE = 64 * 1024
+MMAP_THRESHOLD = 1024 * 1024  # Memory-map files at least this large instead of reading them
+
+# Function to choose the JSON backend: simdjson, then orjson, then the stdlib json module
+def select_json_backend():
+    # DATA_PARSERS_JSON_BACKEND=json (or orjson, simdjson) forces a backend, e.g. to compare them
+    available = {"simdjson": simdjson is not None, "orjson": orjson is not None, "json": True}
+    forced = os.environ.get("DATA_PARSERS_JSON_BACKEND")
+    if forced in available and available[forced]:
+        return forced
+    return next(name for name in available if available[name])
+
+JSON_BACKEND = select_json_backend()
+_simdjson_parser = None
+
+# Raised when the streaming extractor cannot answer and json.load has to
+class _StreamFallback(Exception):
+    pass
+
+# Function to stream a JSON document and return the value at a path of object keys
+def _stream_json_path(f, keys):
+    # Reads fixed-size chunks, tracks only the bracket depth and how many keys
+    # of the path have matched, and returns as soon as the value is decoded.
+    # A key of None matches the first key of its object.
+    buf = f.read(CHUNK_SIZE)
+    eof = not buf
+    pos = 0
+    depth = 0
+    matched = 0
+
+    while True:
+        m = _TOKEN.search(buf, pos)
+        keep = None  # Where to cut the buffer when more data is needed
+
+        if m is None:
+            keep = len(buf)
+        elif m.group()[0] == '"':
+            if m.group(1) is None:
+                keep = m.start()  # String runs past the end of the buffer
+            elif depth == matched + 1:
+                colon = _COLON.match(buf, m.end())
+                if colon is None and _SPACE.match(buf, m.end()).end() == len(buf):
+                    keep = m.start()  # Cannot tell yet whether this is a key
+                elif colon is not None:
+                    token = m.group()
+                    key = json.loads(token) if '\\' in token else token[1:-1]
+                    expected = keys[matched]
+                    start = colon.end()
+
+                    if expected is not None and key != expected:
+                        pos = start  # Some other key, its value is skipped token by token
+                        continue
+
+                    if matched == len(keys) - 1:
+                        try:
+                            value, end = _DECODER.raw_decode(buf, start)
+                        except json.JSONDecodeError:
+                            end = None
+                        # A number at the end of the buffer may be cut short,
+                        # so only trust it once a delimiter follows
+                        if end is not None and (eof or (end < len(buf) and buf[end] in _DELIMITERS)):
+                            return value
+                        keep = m.start()
+                    elif start >= len(buf):
+                        keep = m.start()
+                    elif buf[start] != '{':
+                        raise _StreamFallback()  # The path goes through a non-object
+                    else:
+                        matched += 1
+                        pos = start
+                        continue
+        elif m.group() in '{[':
+            depth += 1
+        else:
+            depth -= 1
+            if depth < matched + 1:
+                raise _StreamFallback()  # Left the matched object without finding the key
+
+        if keep is None:
+            pos = m.end()
+            continue
+
+        # Keep only the unfinished tail and read the next chunk
+        if eof:
+            raise _StreamFallback()
+        chunk = f.read(CHUNK_SIZE)
+        eof = not chunk
+        buf = buf[keep:] + chunk
+        pos = 0
+
+# Function to follow a path of keys through a decoded document
+def _follow_keys(data, keys):
+    for key in keys:
+        data = data[next(iter(data)) if key is None else key]
+    return data
+
+# Function to decode a whole file with orjson, reading bytes or memory-mapping it
+def _orjson_load(json_file_path):
+    if isinstance(json_file_path, bytes):
+        return orjson.loads(json_file_path)  # Already in memory, e.g. an archive member
+    with open(json_file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            return orjson.loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return orjson.loads(view)
+
+# Function to parse a file with simdjson, reusing one parser per process
+def _simdjson_load(json_file_path):
+    global _simdjson_parser
+    if _simdjson_parser is None:
+        _simdjson_parser = simdjson.Parser()
+    if isinstance(json_file_path, bytes):
+        return _simdjson_parser.parse(json_file_path)
+    return _simdjson_parser.load(json_file_path)
+
+# Function to copy a simdjson value out before the parser is reused for the next file
+def _simdjson_copy(value):
+    if isinstance(value, simdjson.Object):
+        return value.as_dict()
+    if isinstance(value, simdjson.Array):
+        return value.as_list()
+    return value
+
+# Function to extract the value at a path of keys by decoding the whole document with the stdlib json module
+def _stdlib_path(json_file_path, keys):
+    if isinstance(json_file_path, bytes):
+        return _follow_keys(json.loads(json_file_path), keys)
+    with open(json_file_path, 'r') as f:
+        return _follow_keys(json.load(f), keys)
+
+# Function to extract the value at a path of keys by decoding the whole document with the fast backend
+def _fast_path(json_file_path, keys):
+    if JSON_BACKEND == "simdjson":
+        # simdjson only materializes the value at the end of the path
+        return _simdjson_copy(_follow_keys(_simdjson_load(json_file_path), keys))
+    return _follow_keys(_orjson_load(json_file_path), keys)
+
+# Function to extract the value at a path of keys from a JSON file (a path, or its bytes)
+def extract_json_path(json_file_path, keys):
+    # A key of None matches the first key of its object. Files on disk are
+    # streamed only as far as the value on every backend, so memory stays
+    # bounded; only what the stream cannot resolve (and archive members,
+    # already in memory) is decoded whole, by the fast backend if there is
+    # one. Its failures are retried with the stdlib so every backend reports
+    # bad files and missing keys with the same messages.
+    if not isinstance(json_file_path, bytes):
+        with open(json_file_path, 'r') as f:
+            try:
+                return _stream_json_path(f, keys)
+            except _StreamFallback:
+                pass
+    if JSON_BACKEND != "json":
+        try:
+            return _fast_path(json_file_path, keys)
+        except (KeyError, RuntimeError, ValueError, OSError):
+            pass
+    return _stdlib_path(json_file_path, keys)
+
+# Function to decode a whole JSON file (a path, or its bytes) with the selected backend
+def load_json_file(json_file_path):
+    if JSON_BACKEND != "json":
+        try:
+            if JSON_BACKEND == "simdjson":
+                return _simdjson_copy(_simdjson_load(json_file_path))
+            return _orjson_load(json_file_path)
+        except (RuntimeError, ValueError, OSError):
+            pass  # Let json.load report the problem below
+
+    if isinstance(json_file_path, bytes):
+        return json.loads(json_file_path)
+    with open(json_file_path, 'r') as f:
+        return json.load(f)
+
+# Function to run one extraction and turn a failure into an error message; returns
+# (value, error, cacheable), where I/O errors (e.g. an NFS EIO) may be transient
+def _extract_one(task):
+    extract, path, args = task
+    try:
+        return extract(path, *args), None, True
+    except OSError as e:
+        return None, f"{e}", False
+    except LOAD_ERRORS as e:
+        return None, f"{e}", True
+
+# Function to run a chunk of extractions in a worker, one (value, error) per task
+def _extract_chunk(tasks):
+    return [_extract_one(task) for task in tasks]
+
+# Function to map the tasks over a process pool in input order, with a few chunks in flight
+def _pool_map(pool, tasks, chunksize, ahead):
+    # tasks is consumed lazily: a chunk is only built (and its files read)
+    # once a chunk in flight has been handed back
+    chunks = iter(lambda: list(itertools.islice(tasks, chunksize)), [])
+    in_flight = collections.deque(pool.submit(_extract_chunk, chunk) for chunk in itertools.islice(chunks, ahead))
+    while in_flight:
+        results = in_flight.popleft().result()
+        chunk = next(chunks, None)
+        if chunk is not None:
+            in_flight.append(pool.submit(_extract_chunk, chunk))
+        yield from results
+
+# Function to extract a value from every file, yielding (value, error) in path order as soon as it is available
+def iter_values(paths, extract, args=(), jobs=1, cache=None, read=None):
+    # With a cache, only files that are new or changed since the last run
+    # are read, and each freshly extracted value is stored as it arrives.
+    # read(paths) yields (path, bytes) for files that are not on disk (e.g.
+    # archive members), in whatever order they are cheapest to read; extract
+    # is then given the bytes instead of the path.
+    hits = {}
+    identities = {}
+    pending = range(len(paths))
+
+    if cache is not None:
+        hits, identities = cache.lookup(paths)
+        pending = sorted(identities)
+
+    # A generator, so each archive member is read just before it is parsed
+    # instead of the whole archive's payload being held in memory up front;
+    # order records which path each task belongs to as it is built
+    if read is None:
+        order = collections.deque(pending)
+        tasks = ((extract, paths[i], args) for i in pending)
+    else:
+        position = {paths[i]: i for i in pending}
+        order = collections.deque()
+
+        def read_tasks():
+            for path, data in read([paths[i] for i in pending]):
+                order.append(position[path])
+                yield extract, data, args
+        tasks = read_tasks()
+    pool = None
+
+    if jobs > 1 and len(pending) > 1:
+        # Decoding is CPU bound, so use processes rather than threads; results
+        # keep the input order no matter which worker finishes first and come
+        # back as soon as the ones before them are done. Archive members go
+        # one per chunk, so only about 2 * jobs of them are in memory at once.
+        chunksize = 1 if read is not None else max(1, len(pending) // (jobs * 4))
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        loaded = _pool_map(pool, tasks, chunksize, jobs * 2)
+    else:
+        loaded = map(_extract_one, tasks)
+
+    # Outcomes that arrive ahead of their path (archive members stored out of
+    # path order) wait here; they are small values, not file contents
+    done = {}
+    try:
+        for i, path in enumerate(paths):
+            if i in hits:
+                yield hits[i]
+                continue
+            while i not in done:
+                value, error, cacheable = next(loaded)
+                j = order.popleft()
+                done[j] = (value, error)
+                if cache is not None and cacheable:
+                    cache.store([(paths[j], identities[j], value, error)])
+            yield done.pop(i)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+# Function to extract a value from every file, in order, optionally in a process pool
+def load_values(paths, extract, args=(), jobs=1, cache=None, read=None):
+    # Returns one value per path (None where it failed) and a list of
+    # (path, error) pairs in the same order as the paths
+    outcomes = list(iter_values(paths, extract, args, jobs, cache, read))
+    values = [value for value, _ in outcomes]
+    errors = [(path, error) for path, (_, error) in zip(paths, outcomes) if error is not None]
+    return values, errors
+
+# Function to print the errors collected while loading, one line per file
+def print_errors(errors):
+    for path, error in errors:
+        print(f"Error processing file {path}: {error}", file=sys.stderr)
+
+# Function to print which JSON backend decoded the files
+def print_json_backend():
+    print(f"JSON backend: {JSON_BACKEND}", file=sys.stderr)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Merge the partial results of a --shard run into the single-run table
+# Last changed: 2026-10-17, the table is as wide as the largest row of parsed runs, as in a single run
+#
+
+import os
+import sys
+import argparse
+
+import tast_parser
+import crossmark_parser
+from results_index import PathIndex
+from results_shard import read_partials
+from results_table import STATS, TableWriter, records_to_groups, rows_from_values
+from results_loader import print_errors
+
+# Function to check if the arguments are provided and read the options
+def check_argument():
+    if len(sys.argv) < 2:
+        print("# how to use")
+        print("for i in 1 2 3 4; do python3 tast_parser.py path/to/tast_tests/ --shard $i/4 > part$i.json & done; wait")
+        print("python3 results_merge.py part1.json part2.json part3.json part4.json | tee mytest.csv")
+        sys.exit(1)  # Exit if no argument is provided
+
+    parser = argparse.ArgumentParser(prog="results_merge.py")
+    parser.add_argument("partials", nargs="+", help="partial result files, one per shard")
+    parser.add_argument("--long", action="store_true",
+                        help="for --all-metrics shards, print one Metric,Config,Run,Value row per run")
+    parser.add_argument("--stats", action="store_true",
+                        help="add Median, Stdev, CV%%, Min, Max and P95 columns after Avg")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv",
+                        help="print CSV rows, or one JSON object per row (JSON Lines)")
+    return parser.parse_args()
+
+
+def main():
+    # Get the arguments and check if they're valid
+    args = check_argument()
+
+    # Read every shard's raw values; exits if a shard is missing or from another run
+    meta, paths, values, errors = read_partials(args.partials)
+    stat_names = STATS if args.stats else ("Avg",)
+
+    # Index the paths of all shards together, exactly as a single run indexes
+    # its scan; crossmark only counts the shallowest files of the whole tree
+    if meta["parser"] == "crossmark":
+        paths = crossmark_parser.keep_shallowest(paths)
+    index = PathIndex(paths, os.path.basename(os.path.normpath(meta["path"])))
+    if meta["parser"] == "crossmark" and index.varying_column is None and len(index.paths) > 1:
+        print("All columns are unique across the paths.")
+
+    if meta["mode"] == "all-metrics":
+        # Same Metric,Config table as tast_parser.py --all-metrics
+        records = tast_parser.metrics_to_records(index, [values[path] for path in index.sorted_paths])
+        writer = TableWriter(["Metric", "Config"], stat_names=stat_names, output_format=args.format, long=args.long)
+        writer.write_rows(records_to_groups(records, ("benchmark", "config"), sort_by="metric"))
+    else:
+        if meta["parser"] == "crossmark":
+            label = crossmark_parser.benchmark_label(meta["json_file"])
+        else:
+            label = tast_parser.metric_label(meta["json_key"])
+
+        # Averages and statistics are recomputed from the raw values of every run
+        writer = TableWriter([label], stat_names=stat_names, output_format=args.format)
+        writer.write_rows([((header,), row) for header, row in rows_from_values(index.groups, values)])
+
+    # Report the files that could not be parsed, in the order a single run would
+    print_errors([(path, errors[path]) for path in index.sorted_paths if path in errors])
+
+if __name__ == "__main__":
+    main()
+
+
+#
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Per-stage timing, I/O and memory report for the parser pipelines (--profile)
+# Last changed: 2026-10-17, I/O counts leave out the reads of /proc/self/io itself
+#
+
+import os
+import sys
+import json
+import time
+import atexit
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+
+# Bytes this process has read from /proc/self/io, which rchar counts like any other read
+_probe_bytes = 0
+
+# Function to read how many bytes this process has read so far (None where /proc is missing)
+def _bytes_read():
+    # rchar is sampled before this read is counted, so taking off every
+    # earlier probe leaves only the bytes the parsers read
+    global _probe_bytes
+    try:
+        with open("/proc/self/io", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    _probe_bytes += len(data)
+    for line in data.splitlines():
+        if line.startswith(b"rchar:"):
+            return int(line.split()[1]) - (_probe_bytes - len(data))
+    return None
+
+# Totals for one stage; a stage entered several times (e.g. once per row) adds up
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.files = 0
+        self.bytes_read = 0
+        self.peak_bytes = 0
+
+    def as_dict(self):
+        return {"name": self.name, "seconds": round(self.seconds, 6), "calls": self.calls, "files": self.files,
+                "bytes_read": self.bytes_read, "peak_bytes": self.peak_bytes}
+
+# Records each pipeline stage and writes the JSON report when the script exits
+class StageProfiler:
+    # report is a file name, or "-" for stderr; cprofile_file, if given, gets
+    # a cProfile dump of the whole run (read it with python3 -m pstats).
+    # stdout is never written to, so the CSV output stays the same.
+    def __init__(self, script, report="-", cprofile_file=None):
+        self.script = script
+        self.report_file = report
+        self.cprofile_file = cprofile_file
+        self.stages = {}
+        self.start = time.perf_counter()
+        self.start_bytes = _bytes_read()
+
+        # Memory peaks come from tracemalloc, which slows the run down but
+        # sees every Python allocation (not the --jobs worker processes)
+        tracemalloc.start()
+        self.cprofile = None
+        if cprofile_file:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        atexit.register(self.report)  # Also covers sys.exit and early returns
+
+    # Time one stage: with profiler.stage("scan") as stage: ...; stage.files = n
+    @contextmanager
+    def stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name)
+
+        tracemalloc.reset_peak()
+        bytes_before = _bytes_read()
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds += time.perf_counter() - start
+            stage.calls += 1
+            bytes_after = _bytes_read()
+            if bytes_before is not None and bytes_after is not None:
+                stage.bytes_read += bytes_after - bytes_before
+            stage.peak_bytes = max(stage.peak_bytes, tracemalloc.get_traced_memory()[1])
+
+    # Time every step of an iterator as one stage, e.g. rows handed out by a parsing generator;
+    # files is the number of files the iterator reads, counted once
+    def iterate(self, name, iterable, files=0):
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as stage:
+                stage.files = files
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    # Write the report (once) and the cProfile dump
+    def report(self):
+        if self.start is None:
+            return
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_file)
+
+        total_bytes = _bytes_read()
+        report = {
+            "script": self.script,
+            "argv": sys.argv[1:],
+            "seconds": round(time.perf_counter() - self.start, 6),
+            "bytes_read": total_bytes - self.start_bytes if total_bytes is not None and self.start_bytes is not None else None,
+            "peak_bytes": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+            "stages": [stage.as_dict() for stage in self.stages.values()],
+        }
+        self.start = None
+        tracemalloc.stop()
+
+        text = json.dumps(report, indent=2)
+        if self.report_file == "-":
+            print(text, file=sys.stderr)
+        else:
+            with open(self.report_file, "w") as f:
+                f.write(text + "\n")
+
+# Profiler that does nothing, used when --profile is not given
+class NullProfiler:
+    @contextmanager
+    def stage(self, name):
+        yield Stage(name)
+
+    def iterate(self, name, iterable, files=0):
+        return iterable
+
+    def report(self):
+        pass
+
+# Function to add the --profile and --cprofile options to a parser
+def add_profile_arguments(parser):
+    parser.add_argument("--profile", nargs="?", const="-", metavar="FILE",
+                        help="write per-stage wall time, files, bytes read and peak memory as JSON to FILE (default: stderr)")
+    parser.add_argument("--cprofile", metavar="FILE",
+                        help="with --profile, also dump cProfile statistics of the whole run to FILE")
+
+# Function to start profiling if --profile was given
+def open_profiler(args):
+    if args.profile is None:
+        return NullProfiler()
+    return StageProfiler(os.path.basename(sys.argv[0]), args.profile, args.cprofile)
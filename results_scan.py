@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Concurrent directory traversal for high-latency filesystems (NFS, sshfs)
+# Last changed: 2026-10-17, listings run on daemon threads so a stuck one cannot hold up exit
+#
+
+import os
+import sys
+import asyncio
+import threading
+
+# Function to list one directory: (name, path, is a directory (following symlinks), is a symlink)
+def _list_directory(path):
+    with os.scandir(path) as entries:
+        return [(entry.name, entry.path, entry.is_dir(), entry.is_symlink()) for entry in entries]
+
+# Function to list one directory on its own thread and hand the outcome to a future of the loop
+def _list_on_thread(loop, future, path):
+    try:
+        outcome = (_list_directory(path), None)
+    except OSError as e:
+        outcome = (None, e)
+
+    def settle():
+        if future.done():
+            return  # The listing timed out and its future was cancelled
+        if outcome[1] is not None:
+            future.set_exception(outcome[1])
+        else:
+            future.set_result(outcome[0])
+
+    try:
+        loop.call_soon_threadsafe(settle)
+    except RuntimeError:
+        pass  # The scan has already finished and closed its loop
+
+# Concurrent scanner: every os.scandir runs on its own thread, so on a slow
+# mount many directories wait on the server at once instead of one by one
+class AsyncScanner:
+    # concurrency caps the listings in flight; a listing that takes longer
+    # than timeout seconds is skipped with a warning. The threads are daemon
+    # threads: one stuck in the kernel on a dead mount is abandoned at exit
+    # instead of being joined, as a thread pool's workers would be.
+    def __init__(self, concurrency=32, timeout=None):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+
+    # List one directory on a daemon thread; None if it cannot be read in time
+    async def _list(self, path):
+        async with self.semaphore:
+            future = self.loop.create_future()
+            threading.Thread(target=_list_on_thread, args=(self.loop, future, path),
+                             name="scan", daemon=True).start()
+            try:
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                print(f"Warning: listing {path} took over {self.timeout}s, skipped", file=sys.stderr)
+                return None
+            except OSError:
+                return None  # Skip unreadable directories, as os.walk does
+
+    # Run a scan coroutine with a fresh loop and semaphore
+    def _run(self, scan):
+        async def runner():
+            self.loop = asyncio.get_running_loop()
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+            return await scan()
+
+        return asyncio.run(runner())
+
+    # Find every file with the given name below root, like os.walk does
+    def find_files(self, root, filename, include=None):
+        # Each directory is listed as soon as its parent has been, so deep and
+        # wide trees are both kept busy. include picks top-level entries (see
+        # --shard). The result set is the serial walk's, sorted.
+        results = []
+
+        async def visit(path, top):
+            entries = await self._list(path)
+            if entries is None:
+                return
+            subdirs = []
+            for name, entry_path, is_dir, is_symlink in entries:
+                if top and include is not None and not include(name):
+                    continue
+                if is_dir:
+                    # os.walk lists symlinked directories but does not descend into them
+                    if not is_symlink:
+                        subdirs.append(entry_path)
+                elif name == filename:
+                    results.append(entry_path)
+            await asyncio.gather(*(visit(subdir, False) for subdir in subdirs))
+
+        self._run(lambda: visit(root, True))
+        return sorted(results)
+
+    # Find the files with the given name at the shallowest depth below root
+    def find_shallowest(self, root, filename, include=None):
+        # Lists one depth level at a time, every directory of the level at
+        # once, and stops at the first level holding a match, like the
+        # crossmark breadth-first scan
+        async def scan():
+            level = [root]
+            top = True
+            while level:
+                listings = await asyncio.gather(*(self._list(directory) for directory in level))
+                results = []
+                next_level = []
+                for entries in listings:
+                    for name, entry_path, is_dir, is_symlink in entries or ():
+                        if top and include is not None and not include(name):
+                            continue
+                        if is_dir and not is_symlink:
+                            next_level.append(entry_path)
+                        elif name == filename:
+                            results.append(entry_path)
+                if results:
+                    return sorted(results)
+                level = next_level
+                top = False
+            return []
+
+        return self._run(scan)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Split a results tree into shards and read back the partial results
+# Last changed: 2026-10-17, --shard i/N partitioning and partial result files
+#
+
+import os
+import sys
+import json
+import zlib
+import argparse
+
+PARTIAL_FORMAT = 1  # Bumped whenever the partial file layout changes
+
+# Function to read a --shard argument such as "2/4" into (2, 4)
+def parse_shard(text):
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a shard like 2/4: {text}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {text} is out of range, use 1/{count} to {count}/{count}")
+    return index, count
+
+# Function to build the filter that keeps the top-level entries of one shard
+def shard_filter(shard):
+    # Every entry directly under the results path (a config directory, or a
+    # file) belongs to exactly one shard, picked by the CRC-32 of its name,
+    # so every process and machine splits the tree the same way
+    index, count = shard
+    return lambda name: zlib.crc32(os.fsencode(name)) % count == index - 1
+
+# Function to write one shard's partial result file
+def write_partial(out, meta, shard, paths, values, errors):
+    # meta describes the run (parser, results path, key, mode) and must be the
+    # same for every shard. Every path is kept, including the ones that failed
+    # (value None), because the merged path index is built from all of them.
+    error_of = dict(errors)
+    partial = dict(meta, format=PARTIAL_FORMAT, shard=list(shard),
+                   files=[[path, value, error_of.get(path)] for path, value in zip(paths, values)])
+    json.dump(partial, out)
+    out.write("\n")
+
+# Function to read the partial result files of every shard of one run
+def read_partials(partial_files):
+    # Returns the shared meta, every path in shard order, {path: value} and
+    # {path: error}; exits if the files come from different runs or a shard
+    # is missing or repeated
+    meta = None
+    seen = {}
+    paths = []
+    values = {}
+    errors = {}
+
+    for partial_file in partial_files:
+        try:
+            with open(partial_file) as f:
+                partial = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading partial file {partial_file}: {e}")
+            sys.exit(1)
+
+        if partial.get("format") != PARTIAL_FORMAT:
+            print(f"{partial_file} is not a partial result file written by --shard.")
+            sys.exit(1)
+        index, count = partial.pop("shard")
+        files = partial.pop("files")
+        if meta is None:
+            meta = partial
+        elif partial != meta:
+            print(f"{partial_file} comes from a different run: {partial} instead of {meta}.")
+            sys.exit(1)
+        if (index, count) in seen or any(other != count for _, other in seen):
+            print(f"{partial_file} repeats shard {index}/{count} or uses a different shard count.")
+            sys.exit(1)
+        seen[(index, count)] = partial_file
+
+        for path, value, error in files:
+            paths.append(path)
+            values[path] = value
+            if error is not None:
+                errors[path] = error
+
+    if meta is None:
+        print("No partial result files given.")
+        sys.exit(1)
+    count = next(iter(seen))[1]
+    missing = [f"{i}/{count}" for i in range(1, count + 1) if (i, count) not in seen]
+    if missing:
+        print(f"Missing partial results for shard {', '.join(missing)}.")
+        sys.exit(1)
+
+    return meta, paths, values, errors
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Run records and the float result matrix (configs x runs) built from them
+# Last changed: 2026-10-17, geometric mean and statistics-only tables
+#
+
+import csv
+import sys
+import json
+import math
+import warnings
+import statistics
+from array import array
+from collections import namedtuple
+
+# NumPy is optional; without it the same statistics are computed row by row
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Statistic columns in output order; "Avg" is the only one printed by default
+STATS = ("Avg", "Median", "Stdev", "CV%", "Min", "Max", "P95")
+# Also computed for every row, but only printed where asked for (irun --aggregate)
+EXTRA_STATS = ("Geomean",)
+
+# Function to format a value for output, leaving missing values empty
+def format_value(value):
+    return '' if value is None or math.isnan(value) else f"{value:.2f}"
+
+# Function to compute a percentile with linear interpolation, like numpy.percentile
+def _percentile(values, q):
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+# Function to compute every statistic for one row of values (no padding)
+def _row_stats(values):
+    if not values:
+        return {name: math.nan for name in STATS + EXTRA_STATS}
+    mean = statistics.fmean(values)
+    # Sample standard deviation in floating point; statistics.stdev uses exact fractions and is far slower
+    stdev = math.sqrt(math.fsum((v - mean) ** 2 for v in values) / (len(values) - 1)) if len(values) > 1 else math.nan
+    return {
+        "Avg": mean,
+        "Median": statistics.median(values),
+        "Stdev": stdev,
+        "CV%": stdev / mean * 100 if mean else math.nan,
+        "Min": min(values),
+        "Max": max(values),
+        "P95": _percentile(values, 95),
+        "Geomean": statistics.geometric_mean(values) if min(values) > 0 else math.nan,
+    }
+
+# Matrix of run values, one row per config, padded with NaN to the longest row
+class ResultMatrix:
+    # labels holds the leading label columns of each row (e.g. [config] or
+    # [metric, config]) and runs the values of each row, of any length
+    def __init__(self, labels, runs):
+        self.labels = [list(label) for label in labels]
+        self.width = max((len(values) for values in runs), default=0)
+
+        if np is not None:
+            self.values = np.full((len(runs), self.width), np.nan, dtype=np.float64)
+            for i, values in enumerate(runs):
+                self.values[i, :len(values)] = values
+        else:
+            padding = array('d', [math.nan])
+            self.values = [array('d', values) + padding * (self.width - len(values)) for values in runs]
+
+    # Compute every statistic for every row; returns {name: [value per row]}
+    def stats(self):
+        if np is None:
+            per_row = [_row_stats([v for v in row if not math.isnan(v)]) for row in self.values]
+            return {name: [row[name] for row in per_row] for name in STATS + EXTRA_STATS}
+
+        values = self.values
+        if self.width == 0:
+            return {name: [math.nan] * len(self.labels) for name in STATS + EXTRA_STATS}  # Nothing to reduce
+
+        with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+            # All-NaN rows (configs where every file failed) give NaN, not a warning
+            warnings.simplefilter("ignore", RuntimeWarning)
+            counts = np.sum(~np.isnan(values), axis=1)
+            mean = np.nansum(values, axis=1) / counts
+            stdev = np.sqrt(np.nansum((values - mean[:, None]) ** 2, axis=1) / (counts - 1))
+            stdev[counts < 2] = np.nan
+            # Geometric mean from the mean log; only defined for rows of positive values
+            geomean = np.exp(np.sum(np.log(np.where(values > 0, values, 1.0)), axis=1) / counts)
+            geomean[np.any(values <= 0, axis=1)] = np.nan
+            result = {
+                "Avg": mean,
+                "Median": np.nanmedian(values, axis=1),
+                "Stdev": stdev,
+                "CV%": np.where(mean != 0, stdev / mean * 100, np.nan),
+                "Min": np.nanmin(values, axis=1),
+                "Max": np.nanmax(values, axis=1),
+                "P95": np.nanpercentile(values, 95, axis=1),
+                "Geomean": geomean,
+            }
+        return {name: column.tolist() for name, column in result.items()}
+
+# One parsed run, as handed to the output writers
+RunRecord = namedtuple("RunRecord", "benchmark config run_id metric value source unit")
+
+# Columnar store of parsed runs shared by all parsers, one row per run
+class RunRecords:
+    # Labels are interned into one string table and stored as array('I')
+    # indices, values as array('d') and sources as references to the scanned
+    # path strings, so appending a run allocates no per-row objects
+    LABELS = ("benchmark", "config", "run_id", "metric", "unit")
+
+    def __init__(self):
+        self.strings = [""]
+        self._string_ids = {"": 0, None: 0}  # A missing label is stored as ""
+        self.columns = {name: array('I') for name in self.LABELS}
+        self.values = array('d')
+        self.sources = []
+
+    # Return the string table index for a label, adding it on first use
+    def _intern(self, text):
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = self._string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    # Add one run
+    def append(self, benchmark, config, run_id, metric, value, source=None, unit=""):
+        intern = self._intern
+        columns = self.columns
+        columns["benchmark"].append(intern(benchmark))
+        columns["config"].append(intern(config))
+        columns["run_id"].append(intern(run_id))
+        columns["metric"].append(intern(metric))
+        columns["unit"].append(intern(unit))
+        self.values.append(value)
+        self.sources.append(source)
+
+    def __len__(self):
+        return len(self.values)
+
+    # Yield every run as a RunRecord
+    def __iter__(self):
+        strings = self.strings
+        labels = zip(*(self.columns[name] for name in self.LABELS))
+        for (benchmark, config, run_id, metric, unit), value, source in zip(labels, self.values, self.sources):
+            yield RunRecord(strings[benchmark], strings[config], strings[run_id], strings[metric],
+                            value, source, strings[unit])
+
+    # Group the values by some label fields; returns {(label, ...): array of values} in first-seen order
+    def grouped(self, fields):
+        groups = {}
+        strings = self.strings
+        for ids, value in zip(zip(*(self.columns[name] for name in fields)), self.values):
+            values = groups.get(ids)
+            if values is None:
+                values = groups[ids] = array('d')
+            values.append(value)
+        return {tuple(strings[i] for i in ids): values for ids, values in groups.items()}
+
+# Function to group run records into (labels, values) pairs for the writers
+def records_to_groups(records, label_fields=("config",), sort_by=None, rows=None):
+    # sort_by names a field (e.g. "metric") to order the groups by instead of
+    # first-seen order; it is not part of the returned labels. rows lists the
+    # label tuples to return in order, so configs where every file failed
+    # still get a row.
+    if sort_by is None:
+        groups = list(records.grouped(label_fields).items())
+    else:
+        grouped = records.grouped((sort_by,) + tuple(label_fields))
+        groups = [(labels[1:], values) for labels, values in sorted(grouped.items(), key=lambda item: item[0][0])]
+
+    if rows is not None:
+        found = dict(groups)
+        groups = [(labels, found.get(labels, array('d'))) for labels in rows]
+    return groups
+
+# Function to build one (header, values) row per group from the values loaded per path
+def rows_from_values(groups, values):
+    # groups maps each header to its sorted paths (PathIndex.groups); files
+    # that failed (None) or were not loaded are left out, as in a normal run
+    rows = []
+    for header, header_results in groups.items():
+        rows.append((header, array('d', (values[path] for path in header_results if values.get(path) is not None))))
+    return rows
+
+# Writes the table one row at a time to stdout, as CSV or as JSON Lines
+class TableWriter:
+    # header_labels name the leading label columns, e.g. ["Speedometer3"] or
+    # ["Metric", "Config"]. The CSV header needs the number of run columns up
+    # front, so a streamed table is given its width (e.g. the largest group
+    # from the path index); write_rows works it out from the groups instead.
+    # With long=True every run gets its own Run,Value row and there are no
+    # statistics columns; with runs=False only the statistics are written,
+    # for rows of too many runs to print (e.g. irun iterations).
+    def __init__(self, header_labels, width=None, stat_names=("Avg",), output_format="csv", long=False, out=None,
+                 runs=True):
+        self.header_labels = list(header_labels)
+        self.width = width
+        self.stat_names = () if long else tuple(stat_names)
+        self.output_format = output_format
+        self.long = long
+        self.runs = runs
+        self.out = out if out is not None else sys.stdout
+        self.csv = csv.writer(self.out, lineterminator="\n") if output_format == "csv" else None
+        self.header_written = False
+
+        # A streamed table knows its width, so its header can go out right away
+        if width is not None:
+            self._write_header()
+
+    # Write the CSV header once, before the first row
+    def _write_header(self):
+        self.header_written = True
+        if self.csv is None:
+            return  # JSON Lines rows name their own fields
+        if self.long:
+            self.csv.writerow(self.header_labels + ["Run", "Value"])
+        else:
+            width = (self.width or 0) if self.runs else 0
+            self.csv.writerow(self.header_labels + [f"R{i}" for i in range(1, width + 1)] + list(self.stat_names))
+
+    # Write one row and flush it, so a pipe sees each config as soon as it is done
+    def write_row(self, labels, values, stats=None):
+        if not self.header_written:
+            self._write_header()
+        labels = list(labels)
+
+        if self.long:
+            for i, value in enumerate(values, 1):
+                if self.csv is not None:
+                    self.csv.writerow(labels + [f"R{i}", format_value(value)])
+                else:
+                    self._write_json(labels, {"Run": f"R{i}", "Value": value})
+        else:
+            # stats maps each statistic name to this row's value; computed here when not given
+            if stats is None:
+                stats = _row_stats([v for v in values if not math.isnan(v)])
+            if self.csv is not None:
+                row = labels
+                if self.runs:
+                    row = row + [format_value(value) for value in values] + [''] * ((self.width or 0) - len(values))
+                for name in self.stat_names:
+                    value = stats[name]
+                    # A config without any values has always reported an average of 0
+                    if name == "Avg" and math.isnan(value):
+                        value = 0
+                    row.append(format_value(value))
+                self.csv.writerow(row)
+            else:
+                fields = {"runs": list(values)} if self.runs else {}
+                fields.update((name, stats[name]) for name in self.stat_names)
+                self._write_json(labels, fields)
+
+        self.out.flush()
+
+    # Write one JSON Lines object keyed by the header labels, with NaN as null
+    def _write_json(self, labels, fields):
+        row = dict(zip(self.header_labels, labels))
+        for name, value in fields.items():
+            if isinstance(value, list):
+                value = [None if math.isnan(v) else v for v in value]
+            elif isinstance(value, float) and math.isnan(value):
+                value = None
+            row[name] = value
+        self.out.write(json.dumps(row) + "\n")
+
+    # Write a whole table at once, computing the statistics in one vectorized pass
+    def write_rows(self, groups):
+        if self.long:
+            if not self.header_written:
+                self._write_header()
+            for labels, values in groups:
+                self.write_row(labels, values)
+            return
+
+        matrix = ResultMatrix([labels for labels, _ in groups], [values for _, values in groups])
+        if not self.header_written:
+            self.width = matrix.width
+            self._write_header()
+        stats = matrix.stats()
+        for i, (labels, values) in enumerate(groups):
+            self.write_row(labels, values, {name: column[i] for name, column in stats.items()})
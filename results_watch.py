@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+#
+# Author:       Rix Woodling
+# Created:      2026-10-17
+# Description:  Watch a results tree and keep the table up to date as new files land
+# Last changed: 2026-10-17, only the selected (shallowest) files are parsed; optional pruning below matches
+#
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+from results_index import PathIndex
+from results_table import TableWriter, rows_from_values
+from results_loader import load_values, print_errors
+
+# inotify event bits, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; the name follows
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# Function to list every file with the given name below a directory, with its identity;
+# with prune, the directories below one holding the file are not listed
+def scan_tree(root, filename, prune=False):
+    found = {}
+    for current, dirs, files in os.walk(root):
+        if filename in files:
+            if prune:
+                dirs[:] = []
+            path = os.path.join(current, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # Removed between the listing and the stat
+            found[path] = (st.st_ino, st.st_size, st.st_mtime_ns)
+    return found
+
+# Watcher that rescans the tree every interval and reports new or changed files
+class PollingWatcher:
+    def __init__(self, root, filename, prune=False):
+        self.root = root
+        self.filename = filename
+        self.prune = prune
+        self.known = scan_tree(root, filename, prune)
+
+    # Every matching file present when watching started
+    def existing(self):
+        return set(self.known)
+
+    # Wait one interval and return the files that are new or changed since the last call
+    def wait(self, interval):
+        time.sleep(interval)
+        current = scan_tree(self.root, self.filename, self.prune)
+        changed = {path for path, identity in current.items() if self.known.get(path) != identity}
+        self.known = current
+        return changed
+
+    def close(self):
+        pass
+
+# Watcher that asks the kernel for file events through inotify (Linux only)
+class InotifyWatcher:
+    # Every directory of the tree gets a watch; new directories are watched
+    # (and listed, for files that landed before the watch) as they appear.
+    # With prune, directories below one holding the file are left unwatched.
+    def __init__(self, root, filename, prune=False):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError(errno.ENOSYS, "libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+
+        self.root = root
+        self.filename = filename
+        self.prune = prune
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}  # Watch descriptor -> directory
+        self.found = set()
+        try:
+            self.found = self._add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    # Watch a directory and everything below it; returns the matching files already there
+    def _add_tree(self, root):
+        found = set()
+        for current, dirs, files in os.walk(root):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(current), _WATCH_MASK)
+            if wd < 0:
+                # ENOSPC means fs.inotify.max_user_watches is too small for this tree
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {current}")
+            self.directories[wd] = current
+            if self.filename in files:
+                found.add(os.path.join(current, self.filename))
+                if self.prune:
+                    dirs[:] = []
+        return found
+
+    # Every matching file present when watching started
+    def existing(self):
+        return set(self.found)
+
+    # Read every queued event and return the matching files that were written or moved in
+    def _read_events(self):
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0'))
+                offset += _EVENT.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped, so report every matching file; unchanged ones come from the cache
+                    changed |= set(scan_tree(self.root, self.filename, self.prune))
+                    continue
+                if mask & IN_IGNORED:
+                    self.directories.pop(wd, None)  # The directory is gone
+                    continue
+                directory = self.directories.get(wd)
+                if directory is None:
+                    continue
+
+                path = os.path.join(directory, name)
+                if mask & IN_ISDIR:
+                    pruned = self.prune and os.path.exists(os.path.join(directory, self.filename))
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not pruned:
+                        changed |= self._add_tree(path)
+                elif name == self.filename and mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    changed.add(path)
+
+    # Wait up to one interval for events, then return the changed files
+    def wait(self, interval):
+        ready, _, _ = select.select([self.fd], [], [], interval)
+        if not ready:
+            return set()
+        # Let a burst of writes (a run finishing) settle into one batch
+        time.sleep(min(interval, 0.2))
+        return self._read_events()
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+# Function to open the best watcher for a tree: inotify when it works, polling otherwise
+def open_watcher(root, filename, polling=False, prune=False):
+    if not polling:
+        try:
+            return InotifyWatcher(root, filename, prune)
+        except OSError as e:
+            print(f"Warning: inotify unavailable ({e.strerror}), polling instead", file=sys.stderr)
+    return PollingWatcher(root, filename, prune)
+
+# Function to watch a results tree and update the table whenever new files land
+def watch_results(root, filename, found, extract, args, header_label, stat_names=("Avg",),
+                  output_format="csv", jobs=1, cache=None, select_paths=None, prune=False, interval=2.0,
+                  polling=False):
+    # found is the scan the parser already did. Only new or rewritten files
+    # are parsed; the path index is rebuilt from the paths seen so far (it is
+    # cheap and the varying column can change as configs appear) and the
+    # values of every other file are reused. CSV re-prints the whole table
+    # after each batch, separated by a blank line; JSON Lines appends only the
+    # rows whose config changed, so the last line for a config is current.
+    # Files that fail to parse are reported on stderr as they are seen.
+    # select_paths narrows the seen paths before anything is parsed
+    # (crossmark keeps only the shallowest ones), so a file a normal run
+    # skips is never read or reported; prune stops the watcher descending
+    # below a directory holding the file. Stops on Ctrl-C.
+    watcher = open_watcher(root, filename, polling, prune)
+    seen = set()
+    values = {}
+    rows_written = {}
+    pending = set(found) | watcher.existing()
+    first = True
+
+    try:
+        while True:
+            # The first table is printed even before any file has landed
+            if pending or first:
+                # Select among every path seen so far, then parse only the new or rewritten selected ones
+                seen |= pending
+                known = select_paths(sorted(seen)) if select_paths is not None else sorted(seen)
+                paths = [path for path in known if path in pending]
+                loaded, errors = load_values(paths, extract, args, jobs, cache)
+                if cache is not None:
+                    cache.commit()
+                values.update(zip(paths, loaded))
+                print_errors(errors)
+
+                # Rebuild the index over the selected paths and recompute the changed rows
+                index = PathIndex(known, os.path.basename(os.path.normpath(root)))
+                rows = rows_from_values(index.groups, values)
+
+                if output_format == "csv":
+                    if not first:
+                        print()
+                    width = max((len(header_results) for header_results in index.groups.values()), default=0)
+                    writer = TableWriter([header_label], width, stat_names, output_format)
+                    for header, row in rows:
+                        writer.write_row((header,), row)
+                else:
+                    writer = TableWriter([header_label], stat_names=stat_names, output_format=output_format)
+                    for header, row in rows:
+                        if rows_written.get(header) != row:
+                            writer.write_row((header,), row)
+                            rows_written[header] = row
+                first = False
+
+            pending = watcher.wait(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
@@ -3,21 +3,73 @@
 # Author:       Rix Woodling
 # Created:      2024-10-11
 # Description:  Parse Speedometer, Speedometer3, MotionMark1_3, and WebXPRT4 tast data into a table 
-# Last updated: 2024-10-14, Cleanup unused function
+# Last updated: 2026-10-17, CSV rows are buffered so the table keeps the width of the parsed runs
 #
 
 import os
+import re
 import sys
-import json
-
-# Function to check if the argument is provided
+import argparse
+
+from results_index import PathIndex
+from results_cache import open_cache
+from results_archive import ArchiveReader, is_archive
+from results_shard import parse_shard, shard_filter, write_partial
+from results_scan import AsyncScanner
+from results_profile import add_profile_arguments, open_profiler
+from results_watch import watch_results
+from results_table import STATS, RunRecords, TableWriter, records_to_groups
+from results_loader import extract_json_path, iter_values, load_json_file, load_values, print_errors, print_json_backend
+
+# Keys reported by --all-metrics, e.g. Benchmark.Speedometer3.Score
+SCORE_KEY = re.compile(r'^Benchmark\..+\.Score$')
+
+# Function to check if the argument is provided and read the options
 def check_argument():
     if len(sys.argv) < 2:
         print("# how to use")
         print("python3 tast_parser.py path/to/tast_tests/")
         print("python3 tast_parser.py path/to/tast_tests/ | tee mytest.csv")
+        print("python3 tast_parser.py path/to/tast_tests/ --jobs 8")
+        print("python3 tast_parser.py path/to/tast_tests/ --all-metrics --metric Custom.Key")
+        print("python3 tast_parser.py path/to/tast_tests/ --format jsonl | jq .")
+        print("python3 tast_parser.py path/to/tast_tests/ --watch")
+        print("python3 tast_parser.py path/to/speedometer3_sweep.tar.gz")
+        print("python3 tast_parser.py path/to/tast_tests/ --shard 1/4 > part1.json")
         sys.exit(1)  # Exit if no argument is provided
-    return sys.argv[1]
+
+    parser = argparse.ArgumentParser(prog="tast_parser.py")
+    parser.add_argument("path", help="directory holding the tast results, or a .tar(.gz) or .zip of it")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="load results-chart.json files in N worker processes")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="read every file instead of reusing the parse cache in ~/.cache")
+    parser.add_argument("--show-json-backend", action="store_true",
+                        help="print the JSON backend in use (simdjson, orjson or json) to stderr")
+    parser.add_argument("--all-metrics", action="store_true",
+                        help="decode each file once and report every Benchmark.*.Score key")
+    parser.add_argument("--metric", action="append", default=[], metavar="KEY",
+                        help="extra results-chart.json key to report (implies --all-metrics)")
+    parser.add_argument("--long", action="store_true",
+                        help="with --all-metrics, print one Metric,Config,Run,Value row per run")
+    parser.add_argument("--stats", action="store_true",
+                        help="add Median, Stdev, CV%%, Min, Max and P95 columns after Avg")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv",
+                        help="print CSV rows, or one JSON object per row (JSON Lines)")
+    parser.add_argument("--scan-concurrency", type=int, default=1, metavar="N",
+                        help="list up to N directories at once while scanning (for NFS or sshfs mounts; default: 1, a serial walk)")
+    parser.add_argument("--scan-timeout", type=float, metavar="SECONDS",
+                        help="with --scan-concurrency, skip (with a warning) directories that take longer to list")
+    add_profile_arguments(parser)
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N",
+                        help="parse only shard I of N (split by top-level directory) and print a partial result file for results_merge.py")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and update the table as new result files land (Ctrl-C stops)")
+    parser.add_argument("--watch-interval", type=float, default=2.0, metavar="SECONDS",
+                        help="how often --watch checks for new files (default: 2)")
+    parser.add_argument("--poll", action="store_true",
+                        help="with --watch, rescan the tree instead of using inotify")
+    return parser.parse_args()
 
 # Function to check if the path exists
 def check_path_exists(path_arg):
@@ -33,14 +85,24 @@ def check_directory(path_arg):
 #        print("Path exists and is a directory.")
         return path_arg  # Return the directory path
     elif os.path.isfile(path_arg):
-        print("Please select a directory as the argument, not a file.")
+        if is_archive(path_arg):
+            return path_arg  # A .tar(.gz) or .zip of a results tree is read in place
+        print("Please select a directory or a .tar/.zip archive as the argument, not a file.")
         sys.exit(1)
 
 # Function to find all "results-chart.json" files in the directory
-def find_results_json(path_arg):
+def find_results_json(path_arg, include=None, concurrency=1, timeout=None):
+    # On slow network mounts, list many directories at once instead
+    if concurrency > 1:
+        return AsyncScanner(concurrency, timeout).find_files(path_arg, "results-chart.json", include)
+
     results = []
     # Use os.walk to search the directory
     for root, dirs, files in os.walk(path_arg):
+        # include picks the top-level entries of one shard (see --shard)
+        if include is not None and root == path_arg:
+            dirs[:] = [d for d in dirs if include(d)]
+            files = [f for f in files if include(f)]
         for file in files:
             if file == "results-chart.json":
                 results.append(os.path.join(root, file))
@@ -67,36 +129,6 @@ def count_slashes(results):
         print("No results to calculate '/' count.")
         return 0
 
-# Function to identify the first non-unique column (separated by '/')
-def find_non_unique_column(results):
-    # Split each result path into components
-    split_results = [result.split('/') for result in results]
-
-    # Iterate through the columns of the paths
-    for i in range(len(split_results[0])):
-        # Extract the i-th element from each split path
-        column_elements = [path[i] for path in split_results]
-
-        # Check if all elements in this column are the same
-        if len(set(column_elements)) > 1:
-#            print(f"Non-unique column is: {i + 1}")  # Adding 1 to make it 1-based index
-            return i + 1
-
-#    print("All columns are unique or no variation found.")
-    return None
-
-# Function to collect unique values from the varying column
-def collect_unique_column(results, column_index):
-    # Split each path into components
-    split_results = [result.split('/') for result in results]
-
-    # Extract the elements in the specified column (column_index is 1-based)
-    column_values = [path[column_index - 1] for path in split_results]
-
-    # Get unique values and sort them numerically (convert to int where possible)
-    unique_values = sorted(set(column_values), key=lambda x: (len(x), x))  # Sorting by length then value
-    return unique_values
-
 # Function to check the argument and return the specific JSON key to use
 def process_based_on_argument(path_arg):
     if "speedometer3" in path_arg:
@@ -115,151 +147,131 @@ def process_based_on_argument(path_arg):
         print("No recognized keyword (speedometer, speedometer3, webxprt4, motionmark1_3) found in the argument.")
         sys.exit(1)
 
-# Function to sort the results by header and subdirectory, using the last unique component
-def sort_results_by_header_and_last_unique_component(results, headers):
-    sorted_results = []
-
-    # Loop through each header in the header list
-    for header in headers:
-        # Filter results that match the current header
-        header_results = [result for result in results if f"/{header}/" in result]
-
-        if header_results:
-            # Split each path into components (using '/' as the delimiter)
-            split_results = [result.split('/') for result in header_results]
-
-            # Determine the length of the shortest path
-            max_depth = min(len(path) for path in split_results)
-
-            # If there's only one result for this header, append it directly
-            if len(header_results) == 1:
-                sorted_results.extend(header_results)
-                continue
-
-            # Start comparing components from the end, going backwards
-            for i in range(1, max_depth + 1):
-                # Get the i-th component from the end for all paths (e.g., run1, run2)
-                components = [path[-i] for path in split_results]
-
-                # Check if all components are the same
-                if len(set(components)) > 1:
-                    # Found the first non-unique component, now sort by this component
-                    sorted_header_results = sorted(header_results, key=lambda x: x.split('/')[-i])
-                    sorted_results.extend(sorted_header_results)  # Add sorted header-specific results to the overall list
-                    break
+# Function to load and extract the 'value' from a JSON file, using the provided key
+def extract_value_from_json(json_file_path, json_key):
+    # Stream the file only as far as data[json_key]["summary"]["value"];
+    # errors are raised to load_values, which collects them per file
+    return extract_json_path(json_file_path, (json_key, "summary", "value"))
+
+# Function to strip "Benchmark." and ".Score" from a JSON key for display
+def metric_label(json_key):
+    return json_key.replace("Benchmark.", "").replace(".Score", "")
+
+# Function to parse data into run records, yielding each header's records as soon as its files are loaded
+def parse_data(index, json_key, errors, jobs=1, cache=None, read=None):
+    benchmark = metric_label(json_key)
+
+    # Load every result (JSON file path) in sorted order, in parallel when jobs > 1
+    # and only for new or changed files when a cache is given; failures are
+    # appended to errors in the same order. read yields archive members.
+    outcomes = iter_values(index.sorted_paths, extract_value_from_json, (json_key,), jobs, cache, read)
+
+    # Loop through each header (e.g., 'TEST_A') and its sorted results
+    for header, header_results in index.groups.items():
+        records = RunRecords()
+        for result, (value, error) in zip(header_results, outcomes):
+            # Skip files that failed to load; values are rounded only at output time
+            if error is not None:
+                errors.append((result, error))
             else:
-                # If all components are the same (e.g., all run1), append them directly
-                sorted_results.extend(header_results)
-        else:
-            # If there are no header results, just skip
-            continue
+                records.append(benchmark, header, index.run_ids.get(result), json_key, value, result)
+        yield header, records
 
-    return sorted_results
+# Function to load a JSON file once and extract every known score plus the extra keys
+def extract_metrics_from_json(json_file_path, extra_keys):
+    data = load_json_file(json_file_path)
+    metrics = {}
 
-# Function to load and extract the 'value' from each JSON file, using the provided key
-def extract_value_from_json(json_file_path, json_key):
-    try:
-        with open(json_file_path, 'r') as f:
-            data = json.load(f)
-            # Use the provided key to navigate through the JSON structure
-            return data[json_key]["summary"]["value"]
-    except (KeyError, FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Error processing file {json_file_path}: {e}")
-        return None  # Return None if there's an error
-
-# Function to parse data and return a main list of sublists with headers and values
-def parse_data(headers, sorted_results, json_key):
-    main_list = []
-
-    # Loop through each header
-    for header in headers:
-        header_list = [header]  # Start with the header name (e.g., 'TEST_A')
-
-        # Filter results that match the current header
-        header_results = [result for result in sorted_results if f"/{header}/" in result]
-
-        # For each result (JSON file path), extract the value using the provided JSON key
+    for key, chart in data.items():
+        if not (SCORE_KEY.match(key) or key in extra_keys):
+            continue
+        # Skip charts without a single summary value (e.g. list_of_scalar_values)
+        summary = chart.get("summary") if isinstance(chart, dict) else None
+        if isinstance(summary, dict) and isinstance(summary.get("value"), (int, float)):
+            metrics[key] = summary["value"]
+
+    if not metrics:
+        raise KeyError("no Benchmark.*.Score or --metric keys")
+    return metrics
+
+# Function to parse every metric in one pass into run records
+def parse_all_metrics(index, extra_keys, jobs=1, cache=None, read=None):
+    # Decode every result once, in sorted order
+    metrics_per_file, errors = load_values(index.sorted_paths, extract_metrics_from_json, (tuple(extra_keys),), jobs, cache, read)
+    return metrics_to_records(index, metrics_per_file), errors
+
+# Function to turn the metrics of each file (in index.sorted_paths order) into run records
+def metrics_to_records(index, metrics_per_file):
+    records = RunRecords()
+    metrics_per_file = iter(metrics_per_file)
+
+    # One record per metric found in each file, keeping header and run order
+    for header, header_results in index.groups.items():
         for result in header_results:
-            value = extract_value_from_json(result, json_key)
-            if value is not None:
-                header_list.append(f"{value:.2f}")  # Append the value to the header list
-
-        # Append the header list (with values) to the main list
-        main_list.append(header_list)
-
-    return main_list
-
-# Function to find the largest sublist in main_list and return its size
-def find_largest_sublist(main_list):
-    max_length = 0  # Initialize the max length variable
-
-    # Loop through each sublist in the main_list
-    for sublist in main_list:
-        # Compare the current sublist length with the max length
-        if len(sublist) > max_length:
-            max_length = len(sublist)  # Update max length if this sublist is larger
-
-    return max_length  # Return the size of the largest sublist
-
-# Function to calculate the average for sublist values and pad sublists
-def pad_and_average_sublists(main_list):
-    max_length = find_largest_sublist(main_list)  # Find the largest sublist size
-
-    for sublist in main_list:
-        # Convert values (from second item onward) to floats for averaging
-        values_to_average = [float(value) for value in sublist[1:]]
-
-        # Calculate the average if there are values
-        avg_value = sum(values_to_average) / len(values_to_average) if values_to_average else 0
+            metrics = next(metrics_per_file)
+            for json_key, value in (metrics or {}).items():
+                records.append(metric_label(json_key), header, index.run_ids.get(result), json_key, value, result)
 
-        # Pad the sublist with empty strings until it matches the largest sublist size
-        sublist.extend([''] * (max_length - len(sublist)))
-
-        # Append the average at the end of the sublist
-        sublist.append(f"{avg_value:.2f}")
-
-    return main_list
-
-# Function to create the header and insert it into the main list
-def insert_header(main_list, json_key, largest_sublist_size):
-    # Strip "Benchmark." and ".Score" from the process_based_on_argument value
-    header_key = json_key.replace("Benchmark.", "").replace(".Score", "")
-
-    # Create a list for the header, starting with the stripped key
-    header = [header_key]
-
-    # Add "R1", "R2", ..., up to "R{largest_sublist_size - 1}"
-    for i in range(1, largest_sublist_size):
-        header.append(f"R{i}")
-
-    # Append 'Avg' as the last column
-    header.append("Avg")
-
-    # Insert the header at the start of the main list
-    main_list.insert(0, header)
-
-    return main_list
-
-# Function to print each sublist in CSV format
-def print_as_csv(main_list):
-    for sublist in main_list:
-        # Join the sublist elements into a single CSV-formatted string
-        csv_line = ','.join(sublist)
-        print(csv_line)
+    return records
 
 
 def main():
     # Get the argument and check if it's valid
-    path_arg = check_argument()
+    args = check_argument()
+    path_arg = args.path
+
+    # With --profile, time each stage below and report it on exit (stdout is untouched)
+    profiler = open_profiler(args)
 
     # Check if the path exists
     check_path_exists(path_arg)
 
-    # Check if the path is a directory
+    # Check if the path is a directory (or an archive of one)
     directory = check_directory(path_arg)
 
-    # Find all instances of "results-chart.json"
-    results = find_results_json(directory)
+    # Find all instances of "results-chart.json", on disk or among the archive members
+    reader = None
+    read = None
+    with profiler.stage("scan") as stage:
+        if os.path.isfile(directory):
+            reader = ArchiveReader(directory, "results-chart.json")
+            results = reader.paths
+            read = reader.read
+        elif args.shard:
+            if args.watch:
+                print("--shard cannot be combined with --watch.")
+                sys.exit(1)
+            # Only the top-level directories of this shard (see results_merge.py)
+            results = find_results_json(directory, shard_filter(args.shard), args.scan_concurrency, args.scan_timeout)
+        else:
+            results = find_results_json(directory, concurrency=args.scan_concurrency, timeout=args.scan_timeout)
+        stage.files = len(results)
+
+    # Archive members have no inode or mtime to check, so they skip the parse cache
+    use_cache = not args.no_cache and reader is None
+
+    if args.shard:
+        # Write this shard's raw values as a partial result file instead of the
+        # table; results_merge.py indexes the paths of every shard together
+        if reader is not None:
+            print("--shard needs a directory; read an archive in one run instead.")
+            sys.exit(1)
+        with profiler.stage("parse") as stage:
+            if args.all_metrics or args.metric:
+                meta = {"parser": "tast", "path": path_arg, "mode": "all-metrics", "metrics": sorted(args.metric)}
+                cache = open_cache(f"tast:all:{','.join(sorted(args.metric))}", use_cache)
+                values, errors = load_values(results, extract_metrics_from_json, (tuple(args.metric),), args.jobs, cache)
+            else:
+                json_key = process_based_on_argument(path_arg)
+                meta = {"parser": "tast", "path": path_arg, "mode": "score", "json_key": json_key}
+                cache = open_cache(f"tast:{json_key}", use_cache)
+                values, errors = load_values(results, extract_value_from_json, (json_key,), args.jobs, cache)
+            if cache is not None:
+                cache.close()
+            stage.files = len(results)
+        with profiler.stage("emit"):
+            write_partial(sys.stdout, meta, args.shard, results, values, errors)
+        return
 
     # Output the results using the new print_results function
 #    print_results(results)
@@ -267,40 +279,88 @@ def main():
     # Count the "/" characters in the first result
     count_slashes(results)
 
-    # Find the non-unique column in the results
-    non_unique_column = find_non_unique_column(results)
-
-    # Collect and sort the unique values from that column
-    headers = collect_unique_column(results, non_unique_column)
-#    print(f"Headers: {headers}")
-
-    # Sort the results by header and subdirectory (merged logic)
-    sorted_results = sort_results_by_header_and_last_unique_component(results, headers)
+    # Index the paths once: the varying column gives the headers, and the
+    # results under each header are sorted by their last differing component
+    with profiler.stage("index") as stage:
+        index = PathIndex(results, os.path.basename(os.path.normpath(path_arg)))
+        stage.files = len(index.sorted_paths)
+#    print(f"Headers: {index.headers}")
 
     # Print the sorted results
-#    print_results(sorted_results)
-
-    # Call process_based_on_argument to process and parse the results
-    #process_based_on_argument(path_arg)
-
-    # Get the appropriate key for JSON parsing (e.g., 'Benchmark.Speedometer.Score')
-    json_key = process_based_on_argument(path_arg)
-
-    # Parse data and get the main list of headers and values
-    main_list = parse_data(headers, sorted_results, json_key)
-
-    largest_sublist_size = find_largest_sublist(main_list)
-#    print(f"Largest sublist contains {largest_sublist_size} items")
-
-    # Modify each sublist by padding and adding the average
-    updated_main_list = pad_and_average_sublists(main_list)
-
-    # Insert the header based on the largest sublist size
-    main_list_with_header = insert_header(main_list, json_key, largest_sublist_size)
-#    print(json_key)
-
-    # Print each sublist in CSV format
-    print_as_csv(main_list)
+#    print_results(index.sorted_paths)
+
+    # Avg only, or every statistic with --stats
+    stat_names = STATS if args.stats else ("Avg",)
+
+    if args.watch:
+        if reader is not None:
+            print("--watch needs a directory; an archive does not change.")
+            sys.exit(1)
+        if args.all_metrics or args.metric:
+            print("--watch reports a single score; it cannot be combined with --all-metrics or --metric.")
+            sys.exit(1)
+
+        # Keep the table up to date while the runs are in flight, parsing only new files
+        json_key = process_based_on_argument(path_arg)
+        cache = open_cache(f"tast:{json_key}", not args.no_cache)
+        watch_results(directory, "results-chart.json", results, extract_value_from_json, (json_key,),
+                      metric_label(json_key), stat_names, args.format, args.jobs, cache,
+                      interval=args.watch_interval, polling=args.poll)
+        if cache is not None:
+            cache.close()
+        return
+
+    if args.all_metrics or args.metric:
+        # Decode each file once and report every known score plus the --metric keys
+        with profiler.stage("parse") as stage:
+            cache = open_cache(f"tast:all:{','.join(sorted(args.metric))}", use_cache)
+            records, errors = parse_all_metrics(index, args.metric, args.jobs, cache, read)
+            if cache is not None:
+                cache.close()
+            stage.files = len(index.sorted_paths)
+
+        # One Metric,Config row per metric and config (or per run with --long), metrics sorted by key;
+        # the metrics are only known once every file is decoded, so the table is written at the end
+        with profiler.stage("emit"):
+            writer = TableWriter(["Metric", "Config"], stat_names=stat_names, output_format=args.format, long=args.long)
+            writer.write_rows(records_to_groups(records, ("benchmark", "config"), sort_by="metric"))
+    else:
+        # Get the appropriate key for JSON parsing (e.g., 'Benchmark.Speedometer.Score')
+        json_key = process_based_on_argument(path_arg)
+
+        # Reuse values from the parse cache for files that have not changed
+        cache = open_cache(f"tast:{json_key}", use_cache)
+
+        writer = TableWriter([metric_label(json_key)], stat_names=stat_names, output_format=args.format)
+
+        # Parse data into run records; every header gets a row, even if none of
+        # its files could be parsed. JSON Lines rows are written as soon as
+        # their files are loaded. The CSV header needs the widest row of parsed
+        # runs, so CSV rows are kept until the end and written in one
+        # vectorized pass.
+        errors = []
+        table = []
+        rows = parse_data(index, json_key, errors, args.jobs, cache, read)
+        for header, records in profiler.iterate("parse", rows, len(index.sorted_paths)):
+            if args.format == "jsonl":
+                with profiler.stage("emit"):
+                    writer.write_row((header,), records.values)
+            else:
+                table.append(((header,), records.values))
+        if cache is not None:
+            cache.close()
+        if args.format == "csv":
+            with profiler.stage("emit"):
+                writer.write_rows(table)
+#        print(json_key)
+
+    if reader is not None:
+        reader.close()
+
+    # Report the files that could not be parsed, after the table
+    print_errors(errors)
+    if args.show_json_backend:
+        print_json_backend()
 
 if __name__ == "__main__":
     main()